@@ -5,66 +5,327 @@ Classic Unix cat implementation in Python
 """
 
 import sys
+import io
+import os
+import stat
+import errno
 import argparse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 
-def cat_file(filename, number_lines=False, number_nonblank=False,
-             squeeze_blank=False, show_ends=False, line_number=1):
+# Largest amount handed to the kernel per copy call
+COPY_CHUNK = 1 << 30
+
+# Buffer reused for every read when the kernel cannot copy for us
+BUFFER_SIZE = 128 * 1024
+copy_buffer = bytearray(BUFFER_SIZE)
+
+# Files opened and read ahead of the one being written, and the most
+# bytes all of them may hold between them
+PREFETCH_FILES = 16
+PREFETCH_BYTES = 32 * 1024 * 1024
+
+# ASCII characters that str.strip() treats as whitespace
+ASCII_SPACE = b' \t\n\r\x0b\x0c\x1c\x1d\x1e\x1f'
+
+# Errors meaning a kernel copy is not supported for this pair of files
+UNSUPPORTED = {errno.EINVAL, errno.ENOSYS, errno.EXDEV, errno.EBADF,
+               errno.EOPNOTSUPP, errno.ENOTSUP}
+
+
+def copy_buffered(src, dst):
+    """Copy from one file descriptor to another through copy_buffer."""
+    reader = io.FileIO(src, closefd=False)
+    view = memoryview(copy_buffer)
+
+    while True:
+        count = reader.readinto(copy_buffer)
+        if not count:
+            break
+        written = 0
+        while written < count:
+            written += os.write(dst, view[written:count])
+
+
+def copy_fd(src, dst):
     """
-    Concatenate a file to stdout with optional formatting.
-    Returns the next line number to use.
+    Copy all remaining data from file descriptor src to dst.  The kernel
+    moves the bytes itself where it can: splice into a pipe,
+    copy_file_range between regular files, or sendfile out of a regular
+    file.  Anything else, or a kernel that refuses, falls back to
+    copy_buffered.
     """
+    src_mode = os.fstat(src).st_mode
+    dst_mode = os.fstat(dst).st_mode
+
     try:
-        if filename == '-':
-            f = sys.stdin
-        else:
-            f = open(filename, 'r')
+        if stat.S_ISFIFO(dst_mode) and hasattr(os, 'splice'):
+            while os.splice(src, dst, COPY_CHUNK):
+                pass
+            return
+
+        if stat.S_ISREG(src_mode) and stat.S_ISREG(dst_mode) and \
+                hasattr(os, 'copy_file_range'):
+            while os.copy_file_range(src, dst, COPY_CHUNK):
+                pass
+            return
+
+        if stat.S_ISREG(src_mode) and hasattr(os, 'sendfile'):
+            offset = os.lseek(src, 0, os.SEEK_CUR)
+            try:
+                while True:
+                    sent = os.sendfile(dst, src, offset, COPY_CHUNK)
+                    if not sent:
+                        break
+                    offset += sent
+            finally:
+                # sendfile does not move the file position itself
+                os.lseek(src, offset, os.SEEK_SET)
+            return
 
-        prev_blank = False
+    except OSError as e:
+        if e.errno not in UNSUPPORTED:
+            raise
 
-        for line in f:
-            # Check if line is blank (just whitespace)
-            is_blank = line.strip() == ''
+    copy_buffered(src, dst)
 
-            # Squeeze multiple blank lines
-            if squeeze_blank and is_blank and prev_blank:
-                continue
 
-            prev_blank = is_blank
+def prefetch_file(filename, limit):
+    """
+    Open a regular file and read up to limit bytes of it.  Returns the
+    still-open file and the bytes read, with the file None if it has
+    already been read to the end, or (None, None) for anything that is
+    not a regular file and must be opened in turn.
+    """
+    if not stat.S_ISREG(os.stat(filename).st_mode):
+        return None, None
+
+    # Unbuffered, so the file position stays just past the head for
+    # copy_fd to carry on from
+    f = open(filename, 'rb', buffering=0)
+    head = bytearray()
+    try:
+        while len(head) < limit:
+            data = f.read(limit - len(head))
+            if not data:
+                f.close()
+                return None, bytes(head)
+            head += data
+    except BaseException:
+        f.close()
+        raise
 
-            # Remove trailing newline for processing
-            line_content = line.rstrip('\n')
+    return f, bytes(head)
+
+
+def prefetched_files(files, jobs):
+    """
+    Yield (filename, future) pairs in order while a pool of threads opens
+    and reads up to jobs files ahead of the one being written, so that
+    open and first-read latency overlaps with output.  Each future
+    holds the result of prefetch_file, capped so that all of them
+    together stay within PREFETCH_BYTES.  Standard input is never read
+    ahead and comes with a future of None.
+    """
+    if jobs < 1 or len(files) < 2:
+        for filename in files:
+            yield filename, None
+        return
 
-            # Build output
+    limit = max(PREFETCH_BYTES // (jobs + 1), 1)
+    pending = deque()
+
+    with ThreadPoolExecutor(jobs) as executor:
+        for filename in files:
+            future = None
+            if filename != '-':
+                future = executor.submit(prefetch_file, filename, limit)
+            pending.append((filename, future))
+            if len(pending) > jobs:
+                yield pending.popleft()
+
+        while pending:
+            yield pending.popleft()
+
+
+def is_blank(line):
+    """Return True if a line of bytes holds nothing but whitespace."""
+    rest = line.translate(None, ASCII_SPACE)
+    if not rest:
+        return True
+    if rest.isascii():
+        return False
+    return rest.decode('utf-8', errors='replace').isspace()
+
+
+def format_stream(f, number_lines=False, number_nonblank=False,
+                  squeeze_blank=False, show_ends=False, line_number=1,
+                  prev_blank=False, head=b'', mid_line=False):
+    """
+    Copy a binary stream to stdout a block at a time, numbering,
+    squeezing and marking lines as requested.  Each block is split on
+    newlines and its output gathered into one buffer and written at
+    once.  Bytes pass through unchanged, whatever their encoding, and a
+    last line without a newline is left without one (or a $), as the
+    unformatted copy leaves it.  With mid_line the stream carries on a
+    line the previous file left unended, so that line is not numbered
+    again.  Any head bytes already read from the stream are formatted
+    first.  Returns the (line_number, prev_blank, mid_line) state to
+    carry into the next file.
+    """
+    read = getattr(f, 'read1', f.read)
+    write = sys.stdout.buffer.write
+    only_ends = not (number_lines or number_nonblank or squeeze_blank)
+    partial = bytearray()  # Start of a line continued in the next block
+
+    while True:
+        if head:
+            block, head = head, b''
+        else:
+            block = read(BUFFER_SIZE)
+        if not block:
+            break
+
+        end = block.rfind(b'\n')
+        if end < 0:
+            partial += block
+            continue
+
+        data = bytes(partial) + block[:end] if partial else block[:end]
+        partial = bytearray(block[end + 1:])
+
+        if only_ends:
+            write(data.replace(b'\n', b'$\n') + b'$\n')
+            mid_line = False
+            continue
+
+        output = []
+        lines = data.split(b'\n')
+        if mid_line:
+            # The rest of a line begun, and numbered, in the last file
+            output += (lines.pop(0), b'$\n' if show_ends else b'\n')
+            mid_line = prev_blank = False
+        for line in lines:
+            line_number, prev_blank = format_line(
+                line, output, number_lines, number_nonblank, squeeze_blank,
+                show_ends, line_number, prev_blank)
+        write(b''.join(output))
+
+    if partial:
+        # Last line without a newline: written as it is, left unended
+        if only_ends or mid_line:
+            write(partial)
+        else:
             output = []
+            line_number, prev_blank = format_line(
+                bytes(partial), output, number_lines, number_nonblank,
+                squeeze_blank, show_ends, line_number, prev_blank, False)
+            write(b''.join(output))
+        mid_line = True
+
+    return line_number, prev_blank, mid_line
 
-            # Line numbering
-            if number_lines or (number_nonblank and not is_blank):
-                output.append(f"{line_number:6}  ")
-                line_number += 1
 
-            output.append(line_content)
+def format_line(line, output, number_lines=False, number_nonblank=False,
+                squeeze_blank=False, show_ends=False, line_number=1,
+                prev_blank=False, ended=True):
+    """
+    Append the formatted form of one line (without its newline) to the
+    output list, ending it unless ended is false.  Returns the updated
+    (line_number, prev_blank).
+    """
+    # Blank lines only matter for -b and -s
+    blank = (squeeze_blank or number_nonblank) and is_blank(line)
 
-            # Show end of line marker
-            if show_ends:
-                output.append('$')
+    # Squeeze multiple blank lines
+    if squeeze_blank and blank and prev_blank:
+        return line_number, prev_blank
 
-            print(''.join(output))
+    # Line numbering
+    if number_lines or (number_nonblank and not blank):
+        output.append(b'%6d  ' % line_number)
+        line_number += 1
 
-        if filename != '-':
-            f.close()
+    output.append(line)
 
-        return line_number
+    # Show end of line marker
+    if ended:
+        output.append(b'$\n' if show_ends else b'\n')
+
+    return line_number, blank
+
+
+def cat_file(filename, number_lines=False, number_nonblank=False,
+             squeeze_blank=False, show_ends=False, line_number=1,
+             prev_blank=False, mid_line=False, prefetched=None):
+    """
+    Concatenate a file to stdout with optional formatting.  A prefetched
+    future from prefetched_files supplies the file already opened and
+    its first bytes read.
+    Returns the (line_number, prev_blank, mid_line) state to use for the
+    next file.
+    """
+    try:
+        f = head = None
+        if prefetched is not None:
+            f, head = prefetched.result()
+        if head is not None:
+            return cat_prefetched(f, head, number_lines, number_nonblank,
+                                  squeeze_blank, show_ends, line_number,
+                                  prev_blank, mid_line)
+
+        if not (number_lines or number_nonblank or squeeze_blank or
+                show_ends):
+            # Nothing to format: copy the bytes straight through
+            sys.stdout.flush()
+            if filename == '-':
+                copy_fd(sys.stdin.fileno(), sys.stdout.fileno())
+            else:
+                with open(filename, 'rb') as f:
+                    copy_fd(f.fileno(), sys.stdout.fileno())
+            return line_number, prev_blank, mid_line
+
+        if filename == '-':
+            return format_stream(sys.stdin.buffer, number_lines,
+                                 number_nonblank, squeeze_blank, show_ends,
+                                 line_number, prev_blank, b'', mid_line)
+
+        with open(filename, 'rb') as f:
+            return format_stream(f, number_lines, number_nonblank,
+                                 squeeze_blank, show_ends, line_number,
+                                 prev_blank, b'', mid_line)
 
     except FileNotFoundError:
         print(f"cat: {filename}: No such file or directory", file=sys.stderr)
-        return line_number
     except PermissionError:
         print(f"cat: {filename}: Permission denied", file=sys.stderr)
-        return line_number
     except Exception as e:
         print(f"cat: {filename}: {e}", file=sys.stderr)
-        return line_number
+
+    return line_number, prev_blank, mid_line
+
+
+def cat_prefetched(f, head, number_lines=False, number_nonblank=False,
+                   squeeze_blank=False, show_ends=False, line_number=1,
+                   prev_blank=False, mid_line=False):
+    """
+    Write the head bytes of a prefetched file, then the rest of the file
+    if it is still open.  Returns the (line_number, prev_blank,
+    mid_line) state.
+    """
+    if number_lines or number_nonblank or squeeze_blank or show_ends:
+        with f or io.BytesIO() as rest:
+            return format_stream(rest, number_lines, number_nonblank,
+                                 squeeze_blank, show_ends, line_number,
+                                 prev_blank, head, mid_line)
+
+    sys.stdout.buffer.write(head)
+    if f is not None:
+        with f:
+            sys.stdout.flush()
+            copy_fd(f.fileno(), sys.stdout.fileno())
+    return line_number, prev_blank, mid_line
 
 
 def main():
@@ -82,6 +343,11 @@ def main():
                         help='squeeze multiple adjacent blank lines')
     parser.add_argument('-E', '--show-ends', action='store_true',
                         help='display $ at end of each line')
+    parser.add_argument('--prefetch', type=int, default=PREFETCH_FILES,
+                        metavar='N',
+                        help='open and read up to N files ahead in '
+                             f'background threads (default: '
+                             f'{PREFETCH_FILES}, 0 to disable)')
 
     args = parser.parse_args()
 
@@ -91,11 +357,13 @@ def main():
     # If no files specified, read from stdin
     files = args.files if args.files else ['-']
 
-    # Process files
-    line_number = 1
-    for filename in files:
-        line_number = cat_file(filename, number_lines, args.number_nonblank,
-                              args.squeeze_blank, args.show_ends, line_number)
+    # Process files, carrying line numbering, blank squeezing and any
+    # unended last line across them
+    state = 1, False, False
+    for filename, prefetched in prefetched_files(files, args.prefetch):
+        state = cat_file(
+            filename, number_lines, args.number_nonblank, args.squeeze_blank,
+            args.show_ends, *state, prefetched)
 
     return 0
 
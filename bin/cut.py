@@ -8,55 +8,156 @@ import sys
 import argparse
 
 
-def parse_list(list_str):
-    """Parse a list like '1,3,5-7' into a set of indices."""
-    indices = set()
-
+# Characters, or bytes with -b, of input read at a time
+READ_SIZE = 64 * 1024
+
+
+def parse_list(list_str, adjacent=True):
+    """
+    Parse a list like '1,3,5-7' or '3-' into sorted (start, stop) slices
+    of 0-based indices, with overlapping ranges merged, and adjacent ones
+    too unless adjacent is false, and a stop of None for a range open to
+    the end of the line.
+    """
+    ranges = []
     for part in list_str.split(','):
-        if '-' in part:
-            start, end = part.split('-', 1)
+        start, dash, end = part.partition('-')
+        if not start and not end:
+            if dash:
+                raise ValueError("invalid range with no endpoint: -")
+            raise ValueError(f"invalid list value: '{list_str}'")
+        try:
             start = int(start) if start else 1
-            end = int(end) if end else float('inf')
-            # Convert to 0-indexed
-            for i in range(start - 1, end if end == float('inf') else end):
-                indices.add(i)
-        else:
-            # Convert to 0-indexed
-            indices.add(int(part) - 1)
-
-    return indices
-
-
-def cut_file(filename, char_list=None, field_list=None, delimiter='\t'):
-    """Cut characters or fields from a file."""
+            if end:
+                stop = int(end)
+            else:
+                stop = None if dash else start
+        except ValueError:
+            raise ValueError(f"invalid list value: '{part}'")
+        if start < 1 or stop is not None and stop < 1:
+            raise ValueError("fields and positions are numbered from 1")
+        if stop is not None and stop < start:
+            raise ValueError("invalid decreasing range")
+        ranges.append((start - 1, stop))
+
+    ranges.sort(key=lambda bounds: bounds[0])
+    slices = [ranges[0]]
+    for start, stop in ranges[1:]:
+        last_start, last_stop = slices[-1]
+        if last_stop is not None and (start > last_stop or
+                                      start == last_stop and not adjacent):
+            slices.append((start, stop))
+        elif last_stop is not None and (stop is None or stop > last_stop):
+            slices[-1] = (last_start, stop)
+
+    return slices
+
+
+def position_selector(slices, output_delimiter=None):
+    """
+    Compile slices into a function that cuts them out of a line, str or
+    bytes, joining the pieces with output_delimiter if one is given.
+    """
+    if len(slices) == 1:
+        start, stop = slices[0]
+        return lambda line: line[start:stop]
+
+    if output_delimiter is None:
+        return lambda line: line[:0].join(
+            [line[start:stop] for start, stop in slices])
+
+    def select(line):
+        pieces = [line[start:stop] for start, stop in slices]
+        return output_delimiter.join([piece for piece in pieces if piece])
+
+    return select
+
+
+def field_selector(slices, delimiter='\t', output_delimiter=None,
+                   only_delimited=False):
+    """
+    Compile slices of fields into a function that cuts them out of a
+    line.  Lines are split only just past the last field wanted, so the
+    rest of a wide line is never broken up.  A line with no delimiter is
+    returned whole, or None with only_delimited.
+    """
+    if output_delimiter is None:
+        output_delimiter = delimiter
+    last = slices[-1][1]
+    maxsplit = -1 if last is None else last
+
+    def undelimited(line):
+        return None if only_delimited else line
+
+    if len(slices) == 1 and last is not None and last - slices[0][0] == 1:
+        index = last - 1
+
+        def select(line):
+            fields = line.split(delimiter, maxsplit)
+            if len(fields) == 1:
+                return undelimited(line)
+            return fields[index] if index < len(fields) else ''
+
+    elif len(slices) == 1:
+        start = slices[0][0]
+
+        def select(line):
+            fields = line.split(delimiter, maxsplit)
+            if len(fields) == 1:
+                return undelimited(line)
+            return output_delimiter.join(fields[start:last])
+
+    else:
+        def select(line):
+            fields = line.split(delimiter, maxsplit)
+            if len(fields) == 1:
+                return undelimited(line)
+            selected = []
+            for start, stop in slices:
+                selected.extend(fields[start:stop])
+            return output_delimiter.join(selected)
+
+    return select
+
+
+def read_blocks(f, newline):
+    """
+    Yield the lines of a stream, without their newlines, as lists read
+    a block at a time.  Works on text or, with newline b'\\n', binary.
+    """
+    partial = newline[:0]
+    while True:
+        data = f.read(READ_SIZE)
+        if not data:
+            break
+        lines = (partial + data).split(newline)
+        partial = lines.pop()
+        yield lines
+
+    if partial:
+        yield [partial]
+
+
+def cut_file(filename, select, binary=False):
+    """
+    Cut the parts chosen by a compiled selector from each line of a file.
+    Lines the selector returns None for are left out.  In binary mode
+    lines are raw bytes, for cutting bytes.
+    """
     try:
         if filename == '-':
-            f = sys.stdin
+            f = sys.stdin.buffer if binary else sys.stdin
         else:
-            f = open(filename, 'r')
-
-        for line in f:
-            line = line.rstrip('\n')
-
-            if char_list is not None:
-                # Character mode
-                output = []
-                for i in sorted(char_list):
-                    if i < len(line):
-                        output.append(line[i])
-                    elif i == float('inf'):
-                        output.append(line[max(char_list) - 1:])
-                        break
-                print(''.join(output))
-
-            elif field_list is not None:
-                # Field mode
-                fields = line.split(delimiter)
-                output = []
-                for i in sorted(field_list):
-                    if i < len(fields):
-                        output.append(fields[i])
-                print(delimiter.join(output))
+            f = open(filename, 'rb' if binary else 'r')
+
+        newline = b'\n' if binary else '\n'
+        out = sys.stdout.buffer if binary else sys.stdout
+        for lines in read_blocks(f, newline):
+            output = [line for line in map(select, lines)
+                      if line is not None]
+            if output:
+                output.append(newline[:0])
+                out.write(newline.join(output))
 
         if filename != '-':
             f.close()
@@ -78,6 +179,8 @@ def main():
                         help='files to process (default: stdin)')
 
     group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('-b', '--bytes', metavar='LIST',
+                       help='select only these bytes')
     group.add_argument('-c', '--characters', metavar='LIST',
                        help='select only these characters')
     group.add_argument('-f', '--fields', metavar='LIST',
@@ -85,24 +188,46 @@ def main():
 
     parser.add_argument('-d', '--delimiter', default='\t', metavar='DELIM',
                         help='use DELIM instead of TAB for field delimiter')
+    parser.add_argument('-s', '--only-delimited', action='store_true',
+                        help='do not print lines not containing delimiters')
+    parser.add_argument('--output-delimiter', metavar='STRING',
+                        help='use STRING as the output delimiter; the '
+                             'default is the input delimiter for fields '
+                             'and none for bytes and characters')
 
     args = parser.parse_args()
 
-    # Parse the list
-    char_list = None
-    field_list = None
+    if not args.delimiter:
+        parser.error('the delimiter must not be empty')
 
-    if args.characters:
-        char_list = parse_list(args.characters)
-    elif args.fields:
-        field_list = parse_list(args.fields)
+    # Compile the list once into a selector for every line
+    try:
+        if args.bytes is not None:
+            output_delimiter = args.output_delimiter
+            if output_delimiter is not None:
+                output_delimiter = output_delimiter.encode(
+                    'utf-8', 'surrogateescape')
+            select = position_selector(
+                parse_list(args.bytes, output_delimiter is None),
+                output_delimiter)
+        elif args.characters is not None:
+            select = position_selector(
+                parse_list(args.characters, args.output_delimiter is None),
+                args.output_delimiter)
+        else:
+            select = field_selector(parse_list(args.fields), args.delimiter,
+                                    args.output_delimiter,
+                                    args.only_delimited)
+    except ValueError as e:
+        print(f"cut: {e}", file=sys.stderr)
+        return 1
 
     # If no files specified, read from stdin
     files = args.files if args.files else ['-']
 
     # Process files
     for filename in files:
-        cut_file(filename, char_list, field_list, args.delimiter)
+        cut_file(filename, select, binary=args.bytes is not None)
 
     return 0
 
@@ -6,87 +6,1414 @@ Classic Unix grep implementation in Python
 
 import sys
 import re
+import io
+import os
+import stat
+import mmap
+import struct
 import argparse
+import contextlib
+import collections
 
 
-def grep(pattern, files, ignore_case=False, invert=False,
-         show_line_numbers=False, count_only=False,
-         suppress_filename=False, files_only=False):
+# Files of at least two chunks are split across workers with -j
+CHUNK_SIZE = 16 * 1024 * 1024
+
+# Bytes examined per step when running an automaton over a buffer
+SCAN_BLOCK = 1024 * 1024
+
+# Most literal words searched for with a regex alternation, which runs in
+# C but slows with every alternative; larger sets use Aho-Corasick
+ALTERNATION_MAX = 64
+
+# Characters that make a pattern a regular expression rather than a literal
+REGEX_SPECIAL = set('.^$*+?{}[]\\|()')
+
+# Trigram index file written by --index-build, and its binary layout:
+# header, file table, file names, sorted trigram table (with a sentinel
+# entry marking the end of the last posting list), then the posting lists
+# as delta-encoded varints of file numbers.  Offsets are from the start of
+# the file, so the whole index can be memory-mapped and searched in place.
+INDEX_NAME = '.grep-index'
+INDEX_MAGIC = b'GTRI'
+INDEX_VERSION = 1
+INDEX_HEADER = struct.Struct('<4sIIIQQQ')  # magic, version, files, trigrams,
+                                           # names, trigram table, postings
+INDEX_FILE = struct.Struct('<QqII')        # size, mtime_ns, name offset, length
+INDEX_TRIGRAM = struct.Struct('<IQ')       # trigram, posting list offset
+
+# Letters whose case-insensitive match in a str regex includes a non-ASCII
+# character (e.g. 'k' also matches KELVIN SIGN), so an ASCII-only bytes
+# prefilter could miss lines for them.
+UNSAFE_CASELESS = set('iksIKS')
+
+# Constructs that behave differently on UTF-8 bytes than on decoded text,
+# or on a whole buffer than on a single line: among them escapes of
+# non-ASCII characters (\xe9, \351, \u00e9, \N{...}), which name a code
+# point in a str pattern but a single byte, or nothing, in a bytes one.
+BYTE_UNSAFE = re.compile(r'\\(?:[wWdDsSbBAZuUN]|x[89a-fA-F]|[23][0-7]{2})|'
+                         r'\[\^|[.$]')
+
+# Inline flag groups, such as (?x) or (?s-i:...), whose flags other than
+# i can change how the rest of a pattern is read
+INLINE_FLAGS = re.compile(r'\(\?([aiLmsux-]+)[:)]')
+
+
+def required_literal(pattern):
+    """
+    Return the longest literal string that every match of a regular
+    expression must contain, or '' if none can be found.  This is
+    deliberately conservative: alternation and inline flags other than
+    i give up, and groups and character classes are skipped over rather
+    than analysed.
+    """
+    if '|' in pattern:
+        return ''
+    if any(set(flags) - {'i'} for flags in INLINE_FLAGS.findall(pattern)):
+        return ''
+
+    best = ''
+    run = []
+    depth = 0
+    i = 0
+    n = len(pattern)
+
+    def end_run():
+        nonlocal best
+        if len(run) > len(best):
+            best = ''.join(run)
+        run.clear()
+
+    while i < n:
+        c = pattern[i]
+
+        if c == '\\':
+            nxt = pattern[i + 1] if i + 1 < n else ''
+            i += 2
+            if not nxt.isalnum():
+                # Escaped punctuation is a literal character
+                if depth == 0:
+                    run.append(nxt)
+                continue
+            # Character class or special escape: skip its arguments
+            if nxt == 'x':
+                i += 2
+            elif nxt == 'u':
+                i += 4
+            elif nxt == 'U':
+                i += 8
+            elif nxt == 'N':
+                i = pattern.find('}', i) + 1 or n
+            elif nxt.isdigit():
+                while i < n and pattern[i].isdigit():
+                    i += 1
+            end_run()
+            continue
+
+        if c == '[':
+            # Skip the whole character class
+            end_run()
+            i += 1
+            if i < n and pattern[i] == '^':
+                i += 1
+            if i < n and pattern[i] == ']':
+                i += 1
+            while i < n and pattern[i] != ']':
+                i += 2 if pattern[i] == '\\' else 1
+            i += 1
+            continue
+
+        if c == '{':
+            m = re.match(r'\{\d*(,\d*)?\}', pattern[i:])
+            if m:
+                # Counted repeat: the preceding character may be absent
+                if run:
+                    run.pop()
+                end_run()
+                i += m.end()
+                continue
+            end_run()
+        elif c in '*?':
+            if run:
+                run.pop()
+            end_run()
+        elif c == '+':
+            end_run()
+        elif c == '(':
+            depth += 1
+            end_run()
+        elif c == ')':
+            depth -= 1
+            end_run()
+        elif c in '.^$':
+            end_run()
+        elif depth == 0:
+            run.append(c)
+        i += 1
+
+    end_run()
+    return best
+
+
+def is_byte_safe(pattern):
+    """
+    Return True if a regular expression matches the UTF-8 encoding of
+    any text exactly where it matches the text itself, so it can be run
+    as a bytes regex without decoding.
+    """
+    return (pattern.isascii() and not BYTE_UNSAFE.search(pattern) and
+            not INLINE_FLAGS.search(pattern))
+
+
+def make_finder(pattern, regex, fixed=False, null_data=False):
+    """
+    Build a find(buf, pos) function that returns the offset of the next
+    possible match in a bytes buffer at or after pos, or -1.  Returns
+    None if the pattern has no cheap byte-level prefilter.  With
+    null_data, records end in NUL rather than newline, so only literal
+    prefilters are safe.
+    """
+    ignore_case = bool(regex.flags & re.IGNORECASE)
+    literal = pattern if fixed else required_literal(pattern)
+
+    if literal and (not ignore_case or
+                    literal.lower() == literal == literal.upper()):
+        needle = literal.encode('utf-8')
+        return lambda buf, pos: buf.find(needle, pos)
+
+    if literal and literal.isascii() and not UNSAFE_CASELESS & set(literal):
+        candidates = re.compile(re.escape(literal.encode('ascii')),
+                                re.IGNORECASE)
+    elif (not fixed and not ignore_case and not null_data and
+          is_byte_safe(pattern)):
+        try:
+            candidates = re.compile(pattern.encode('ascii'), re.MULTILINE)
+        except re.error:
+            return None
+    else:
+        return None
+
+    def find(buf, pos):
+        match = candidates.search(buf, pos)
+        return match.start() if match else -1
+
+    return find
+
+
+class AhoCorasick:
+    """
+    Aho-Corasick automaton over a set of literal words (str or bytes).
+    It is built once, after which find() runs in time linear in the text
+    no matter how many words there are.
+    """
+
+    def __init__(self, words):
+        self.goto = [{}]
+        self.output = [False]
+        self.longest = 0
+
+        # Build the trie of all words
+        for word in words:
+            state = 0
+            for symbol in word:
+                nxt = self.goto[state].get(symbol)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto.append({})
+                    self.output.append(False)
+                    self.goto[state][symbol] = nxt
+                state = nxt
+            self.output[state] = True
+            self.longest = max(self.longest, len(word))
 
+        # Breadth-first pass to compute failure links
+        self.fail = [0] * len(self.goto)
+        queue = collections.deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for symbol, nxt in self.goto[state].items():
+                queue.append(nxt)
+                fallback = self.fail[state]
+                while fallback and symbol not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[nxt] = self.goto[fallback].get(symbol, 0)
+                if self.output[self.fail[nxt]]:
+                    self.output[nxt] = True
+
+    def find(self, text):
+        """Return the index just past the first match in text, or -1."""
+        return self.scan(text)[0]
+
+    def scan(self, text, start=0, state=0):
+        """
+        Run the automaton over text from index start, beginning in the
+        given state.  Return the index just past the first match, or -1,
+        and the state reached, so that a scan can carry on into the next
+        block of a longer text.
+        """
+        goto = self.goto
+        fail = self.fail
+        output = self.output
+        if start:
+            text = memoryview(text)[start:]
+
+        for i, symbol in enumerate(text, start):
+            while state and symbol not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(symbol, 0)
+            if output[state]:
+                return i + 1, state
+
+        return -1, state
+
+
+class PatternSet:
+    """
+    Match lines against many patterns at once.  Plain literals go into
+    one regex alternation, or an Aho-Corasick automaton when there are
+    many, and the remaining regular expressions are compiled separately.
+    search() mirrors re.Pattern.search closely enough to be used in its
+    place: it returns None when nothing matches.
+    """
+
+    def __init__(self, literals, regexes, ignore_case=False):
+        self.ignore_case = ignore_case
+        self.match_all = '' in literals
+        if ignore_case:
+            literals = [word.lower() for word in literals]
+        if not literals:
+            self.literals = None
+        elif len(literals) <= ALTERNATION_MAX:
+            self.literals = re.compile('|'.join(map(re.escape, literals)))
+        else:
+            self.literals = AhoCorasick(literals)
+        flags = re.IGNORECASE if ignore_case else 0
+        self.regexes = [re.compile(r, flags) for r in regexes]
+
+    def search(self, line):
+        if self.match_all:
+            return True
+        if self.literals is not None:
+            text = line.lower() if self.ignore_case else line
+            if isinstance(self.literals, AhoCorasick):
+                if self.literals.find(text) >= 0:
+                    return True
+            elif self.literals.search(text) is not None:
+                return True
+        for regex in self.regexes:
+            if regex.search(line) is not None:
+                return True
+        return None
+
+
+def read_patterns(pattern_file):
+    """Read patterns from a file, one per line."""
+    if pattern_file == '-':
+        return [line.rstrip('\n') for line in sys.stdin]
+    with open(pattern_file, 'r') as f:
+        return [line.rstrip('\n') for line in f]
+
+
+def is_literal(pattern):
+    """Return True if a regular expression contains no special characters."""
+    return not any(c in REGEX_SPECIAL for c in pattern)
+
+
+def make_literal_finder(words, ignore_case=False):
+    """
+    Build a find(buf, pos) function that locates any of several literal
+    words in a bytes buffer: a few with a regex alternation, more with an
+    Aho-Corasick automaton, working through the buffer a block at a time.
+    Returns None if the words cannot be matched exactly at the byte level.
+    """
+    if ignore_case:
+        if not all(w.isascii() and not UNSAFE_CASELESS & set(w)
+                   for w in words):
+            return None
+        words = [w.lower() for w in words]
+
+    if len(words) <= ALTERNATION_MAX:
+        alternation = re.compile(
+            b'|'.join(re.escape(w.encode('utf-8')) for w in words),
+            re.IGNORECASE if ignore_case else 0)
+
+        def find(buf, pos):
+            match = alternation.search(buf, pos)
+            return match.start() if match else -1
+
+        return find
+
+    automaton = AhoCorasick([w.encode('utf-8') for w in words])
+    # The block last copied out of the buffer (and lowercased), kept so
+    # that each call only scans on from pos instead of copying afresh
+    cache = {'buf': None, 'start': 0, 'block': b''}
+
+    def load(buf, start):
+        block = buf[start:start + SCAN_BLOCK]
+        cache.update(buf=buf, start=start,
+                     block=block.lower() if ignore_case else block)
+
+    def find(buf, pos):
+        if not (cache['buf'] is buf and
+                cache['start'] <= pos < cache['start'] + len(cache['block'])):
+            if pos >= len(buf):
+                return -1
+            load(buf, pos)
+
+        # The automaton state carries across blocks, so matches that
+        # straddle a block boundary are still seen
+        index = pos - cache['start']
+        state = 0
+        while True:
+            end, state = automaton.scan(cache['block'], index, state)
+            if end >= 0:
+                return cache['start'] + end - 1
+            following = cache['start'] + len(cache['block'])
+            if following >= len(buf):
+                return -1
+            load(buf, following)
+            index = 0
+
+    return find
+
+
+def combine_finders(finders):
+    """Combine several find(buf, pos) functions into one."""
+    if any(find is None for find in finders):
+        return None
+    if len(finders) == 1:
+        return finders[0]
+
+    # Remember each finder's next hit: while it lies at or after pos it is
+    # still the next hit, so no finder rescans a stretch it has covered
+    state = {'buf': None, 'hits': None}
+
+    def find(buf, pos):
+        if state['buf'] is not buf:
+            state['buf'] = buf
+            state['hits'] = [None] * len(finders)
+        hits = state['hits']
+        for i, finder in enumerate(finders):
+            if hits[i] is None or 0 <= hits[i] < pos:
+                hits[i] = finder(buf, pos)
+        found = [hit for hit in hits if hit >= 0]
+        return min(found) if found else -1
+
+    return find
+
+
+def compile_patterns(patterns, ignore_case=False, fixed=False,
+                     null_data=False, multiline=False):
+    """
+    Compile the search patterns.  Returns (regex, find), where regex is a
+    compiled regular expression or PatternSet used to confirm each line
+    and find is a byte-level prefilter for scan_buffer (or None).
+    For multiline, regex is instead a single regular expression to run
+    over the whole buffer: bytes when it matches UTF-8 exactly as it would
+    the decoded text, otherwise str.  Raises re.error for an invalid
+    pattern.
+    """
     flags = re.IGNORECASE if ignore_case else 0
-    try:
-        regex = re.compile(pattern, flags)
-    except re.error as e:
-        print(f"grep: invalid pattern: {e}", file=sys.stderr)
-        return 2
 
-    # If no files specified, read from stdin
-    if not files:
-        files = ['-']
+    if multiline:
+        sources = [re.escape(p) if fixed else p for p in patterns]
+        if len(sources) == 1:
+            source = sources[0]
+        else:
+            source = '|'.join(f'(?:{p})' for p in sources) or '(?!)'
+        if not ignore_case and (fixed or all(map(is_byte_safe, patterns))):
+            try:
+                return re.compile(source.encode('utf-8'), re.MULTILINE), None
+            except re.error:
+                pass
+        return re.compile(source, flags | re.MULTILINE), None
 
-    # Determine if we should show filenames
-    show_filename = len(files) > 1 and not suppress_filename
+    if len(patterns) == 1:
+        pattern = patterns[0]
+        regex = re.compile(re.escape(pattern) if fixed else pattern, flags)
+        return regex, make_finder(pattern, regex, fixed, null_data)
 
-    exit_status = 1  # Default: no matches found
+    if fixed:
+        literals, regexes = list(patterns), []
+    else:
+        literals = [p for p in patterns if is_literal(p)]
+        regexes = [p for p in patterns if not is_literal(p)]
+
+    regex = PatternSet(literals, regexes, ignore_case)
+    if not patterns:
+        return regex, lambda buf, pos: -1
+    if regex.match_all:
+        return regex, None
+
+    finders = []
+    if len(literals) == 1:
+        finders.append(make_finder(literals[0], re.compile(
+            re.escape(literals[0]), flags), fixed=True))
+    elif literals:
+        finders.append(make_literal_finder(literals, ignore_case))
+    for pattern, compiled in zip(regexes, regex.regexes):
+        finders.append(make_finder(pattern, compiled, null_data=null_data))
+
+    return regex, combine_finders(finders)
+
+
+def read_records(f, separator=b'\0'):
+    """
+    Yield the records of a binary stream as text, each still ending in
+    its separator (like lines from a text file end in a newline).
+    """
+    read = getattr(f, 'read1', f.read)
+    pending = bytearray()
+
+    while True:
+        block = read(SCAN_BLOCK)
+        if not block:
+            break
+        pieces = block.split(separator)
+        for piece in pieces[:-1]:
+            pending += piece
+            pending += separator
+            yield pending.decode('utf-8', errors='replace')
+            pending.clear()
+        pending += pieces[-1]
+
+    if pending:
+        yield pending.decode('utf-8', errors='replace')
+
+
+def scan_lines(f, regex, invert=False, eol='\n'):
+    """
+    Yield (line_number, line) for each selected line of a text stream,
+    or for each record ending in eol.
+    """
+    line_number = 0
+
+    for line in f:
+        line_number += 1
+        # Remove trailing newline for matching
+        line_stripped = line.rstrip(eol)
+
+        matches = regex.search(line_stripped) is not None
+        if invert:
+            matches = not matches
+
+        if matches:
+            yield line_number, line_stripped
+
+
+def scan_buffer(buf, find, regex, number_lines=False, start=0, end=None,
+                eol=b'\n'):
+    """
+    Yield (line_number, line) for each matching line of a bytes buffer,
+    or of the newline-aligned range buf[start:end].  Only the line around
+    each candidate offset returned by find() is decoded and checked
+    against the regex; everything else stays bytes.  Line numbers are
+    relative to start and only counted when number_lines is set.
+    Lines end in eol, which is NUL for -z.
+    """
+    size = len(buf) if end is None else end
+    pos = start
+    newlines = 0
+
+    while pos < size:
+        hit = find(buf, pos)
+        if hit < 0 or hit >= size:
+            break
+
+        start = buf.rfind(eol, pos, hit) + 1 or pos
+        end = buf.find(eol, hit)
+        if end < 0:
+            end = size
+
+        if number_lines:
+            newlines += buf[pos:start].count(eol)
+
+        line = buf[start:end]
+        if eol == b'\n' and line.endswith(b'\r'):
+            line = line[:-1]
+        line = line.decode('utf-8', errors='replace')
+
+        if regex.search(line) is not None:
+            yield newlines + 1, line
+
+        if number_lines:
+            newlines += 1
+        pos = end + 1
+
+
+def scan_range(f, start, end, regex, invert=False):
+    """
+    Yield (line_number, line) for each selected line in the byte range
+    [start, end) of a binary file, which must begin and end on line
+    boundaries.  Line numbers are relative to start.
+    """
+    f.seek(start)
+    remaining = end - start
+    line_number = 0
+
+    for line in f:
+        if remaining <= 0:
+            break
+        remaining -= len(line)
+        line_number += 1
+
+        line = line.rstrip(b'\n')
+        if line.endswith(b'\r'):
+            line = line[:-1]
+        line = line.decode('utf-8', errors='replace')
+
+        if (regex.search(line) is not None) != invert:
+            yield line_number, line
 
+
+def scan_multiline(buf, regex, invert=False, number_lines=False, eol=b'\n'):
+    """
+    Yield (line_number, text) for each match of a regular expression run
+    over a whole bytes buffer, so that matches can span lines.  A str
+    regex is run over the decoded buffer instead.  Each match is widened
+    to the complete lines (or records) it touches and the whole range is
+    output, numbered by its first line.  With invert, the lines outside
+    every match are output one by one instead.
+    """
+    if isinstance(regex.pattern, str):
+        buf = str(buf, 'utf-8', errors='replace')
+        eol = eol.decode('ascii')
+        decode = str
+    else:
+        def decode(text):
+            return text.decode('utf-8', errors='replace')
+
+    size = len(buf)
+    pos = 0
+    line_number = 1
+
+    while pos < size:
+        match = regex.search(buf, pos)
+        if match is None:
+            start = end = size
+        else:
+            start = buf.rfind(eol, pos, match.start()) + 1 or pos
+            end = buf.find(eol, max(match.end() - 1, match.start()))
+            if end < 0:
+                end = size
+
+        if invert and start > pos:
+            lines = buf[pos:start].split(eol)
+            if not lines[-1]:
+                lines.pop()
+            for line in lines:
+                yield line_number, decode(line)
+                line_number += 1
+        elif number_lines:
+            line_number += buf[pos:start].count(eol)
+
+        if match is None:
+            break
+
+        text = buf[start:end]
+        if not invert:
+            yield line_number, decode(text)
+        if number_lines or invert:
+            line_number += text.count(eol) + 1
+        pos = end + 1
+
+
+def count_newlines(buf, start, end, block=1 << 20):
+    """Count newlines in buf[start:end] without copying it all at once."""
+    newlines = 0
+    for pos in range(start, end, block):
+        newlines += buf[pos:min(pos + block, end)].count(b'\n')
+    return newlines
+
+
+def split_ranges(buf, chunk_size):
+    """Split a buffer into (start, end) ranges that end on newlines."""
+    size = len(buf)
+    ranges = []
+    start = 0
+    while start < size:
+        end = buf.find(b'\n', start + chunk_size - 1)
+        end = size if end < 0 else end + 1
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+
+def search_file(filename, regex, find=None, invert=False,
+                number_lines=False, null_data=False, multiline=False):
+    """
+    Yield (line_number, line) for each selected line of a file, or each
+    NUL-terminated record with null_data.  Regular files are
+    memory-mapped and searched as bytes when a prefilter is available;
+    everything else is read line by line.  With multiline, the regex is
+    run over the whole file (standard input is read into memory first)
+    and each match yields the range of lines it covers.
+    """
+    eol = b'\0' if null_data else b'\n'
+
+    if filename == '-':
+        if multiline:
+            yield from scan_multiline(sys.stdin.buffer.read(), regex, invert,
+                                      number_lines, eol)
+        elif null_data:
+            yield from scan_lines(read_records(sys.stdin.buffer), regex,
+                                  invert, '\0')
+        else:
+            yield from scan_lines(sys.stdin, regex, invert)
+        return
+
+    with open(filename, 'rb') as f:
+        info = os.fstat(f.fileno())
+        mappable = stat.S_ISREG(info.st_mode) and info.st_size > 0
+        if multiline and mappable:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                yield from scan_multiline(buf, regex, invert, number_lines,
+                                          eol)
+        elif multiline:
+            yield from scan_multiline(f.read(), regex, invert, number_lines,
+                                      eol)
+        elif find is not None and not invert and mappable:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                yield from scan_buffer(buf, find, regex, number_lines,
+                                       eol=eol)
+        elif null_data:
+            yield from scan_lines(read_records(f), regex, invert, '\0')
+        else:
+            yield from scan_lines(io.TextIOWrapper(f), regex, invert)
+
+
+def expand_files(files, recursive=False):
+    """
+    Yield the files to search, in order.  With recursive set, directories
+    are walked and their files yielded in sorted order.
+    """
     for filename in files:
+        if not (recursive and filename != '-' and os.path.isdir(filename)):
+            yield filename
+            continue
+
+        def report(error):
+            print(f"grep: {error.filename}: {error.strerror}", file=sys.stderr)
+
+        for root, dirs, names in os.walk(filename, onerror=report):
+            dirs.sort()
+            for name in sorted(names):
+                yield os.path.join(root, name)
+
+
+def encode_postings(numbers):
+    """Encode an increasing list of integers as delta varints."""
+    out = bytearray()
+    prev = 0
+    for n in numbers:
+        delta = n - prev
+        prev = n
+        while delta >= 0x80:
+            out.append(delta & 0x7f | 0x80)
+            delta >>= 7
+        out.append(delta)
+    return out
+
+
+def decode_postings(data):
+    """Decode delta varints back into a set of integers."""
+    numbers = set()
+    value = shift = prev = 0
+    for byte in data:
+        value |= (byte & 0x7f) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        prev += value
+        numbers.add(prev)
+        value = shift = 0
+    return numbers
+
+
+def file_trigrams(path):
+    """Return the set of trigrams in a file, as ASCII-lowercased bytes."""
+    trigrams = set()
+    tail = b''
+    with open(path, 'rb') as f:
+        while True:
+            block = f.read(SCAN_BLOCK)
+            if not block:
+                break
+            data = tail + block.lower()
+            trigrams.update(data[i:i + 3] for i in range(len(data) - 2))
+            tail = data[-2:]
+    return trigrams
+
+
+def index_files(directory):
+    """List the files under a directory that an index covers, in order."""
+    return [path for path in expand_files([directory], recursive=True)
+            if os.path.basename(path) != INDEX_NAME]
+
+
+def build_index(directory):
+    """
+    Write a trigram index of every file under a directory to
+    directory/.grep-index.  Returns an exit status.
+    """
+    entries = []
+    postings = collections.defaultdict(list)
+
+    for path in index_files(directory):
         try:
-            if filename == '-':
-                f = sys.stdin
-                display_name = '(standard input)'
+            info = os.stat(path)
+            trigrams = file_trigrams(path)
+        except Exception as e:
+            print(error_message(path, e), file=sys.stderr)
+            return 2
+
+        file_id = len(entries)
+        name = os.path.relpath(path, directory).encode('utf-8')
+        entries.append((info.st_size, info.st_mtime_ns, name))
+        for trigram in trigrams:
+            postings[trigram].append(file_id)
+
+    keys = sorted(postings)
+
+    names = bytearray()
+    file_table = bytearray()
+    for size, mtime_ns, name in entries:
+        file_table += INDEX_FILE.pack(size, mtime_ns, len(names), len(name))
+        names += name
+
+    names_offset = INDEX_HEADER.size + len(file_table)
+    trigrams_offset = names_offset + len(names)
+    postings_offset = trigrams_offset + (len(keys) + 1) * INDEX_TRIGRAM.size
+
+    trigram_table = bytearray()
+    posting_data = bytearray()
+    for key in keys:
+        trigram_table += INDEX_TRIGRAM.pack(
+            int.from_bytes(key, 'big'), postings_offset + len(posting_data))
+        posting_data += encode_postings(postings[key])
+    trigram_table += INDEX_TRIGRAM.pack(
+        0xffffffff, postings_offset + len(posting_data))
+
+    header = INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, len(entries),
+                               len(keys), names_offset, trigrams_offset,
+                               postings_offset)
+
+    index_path = os.path.join(directory, INDEX_NAME)
+    temp_path = index_path + '.tmp'
+    try:
+        with open(temp_path, 'wb') as f:
+            for part in (header, file_table, names, trigram_table,
+                         posting_data):
+                f.write(part)
+        os.replace(temp_path, index_path)
+    except Exception as e:
+        print(error_message(index_path, e), file=sys.stderr)
+        return 2
+
+    return 0
+
+
+class TrigramIndex:
+    """Read-only view of a memory-mapped trigram index."""
+
+    def __init__(self, directory):
+        with open(os.path.join(directory, INDEX_NAME), 'rb') as f:
+            self.buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (magic, version, file_count, self.trigram_count, names_offset,
+         self.trigrams_offset, _) = INDEX_HEADER.unpack_from(self.buf)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            raise ValueError('not a grep index')
+
+        # Map each relative path to (file number, size, mtime_ns)
+        self.files = {}
+        for file_id in range(file_count):
+            size, mtime_ns, offset, length = INDEX_FILE.unpack_from(
+                self.buf, INDEX_HEADER.size + file_id * INDEX_FILE.size)
+            start = names_offset + offset
+            name = self.buf[start:start + length].decode('utf-8')
+            self.files[name] = (file_id, size, mtime_ns)
+
+    def postings(self, trigram):
+        """Return the set of file numbers containing a trigram."""
+        key = int.from_bytes(trigram, 'big')
+        low, high = 0, self.trigram_count
+        while low < high:
+            mid = (low + high) // 2
+            found, start = INDEX_TRIGRAM.unpack_from(
+                self.buf, self.trigrams_offset + mid * INDEX_TRIGRAM.size)
+            if found < key:
+                low = mid + 1
+            elif found > key:
+                high = mid
             else:
-                f = open(filename, 'r')
-                display_name = filename
+                _, end = INDEX_TRIGRAM.unpack_from(
+                    self.buf,
+                    self.trigrams_offset + (mid + 1) * INDEX_TRIGRAM.size)
+                return decode_postings(self.buf[start:end])
+        return set()
 
-            match_count = 0
-            line_number = 0
+    def close(self):
+        self.buf.close()
 
-            for line in f:
-                line_number += 1
-                # Remove trailing newline for matching
-                line_stripped = line.rstrip('\n')
 
-                matches = regex.search(line_stripped) is not None
-                if invert:
-                    matches = not matches
+def query_literals(patterns, ignore_case=False, fixed=False):
+    """
+    Return the literal strings, one per pattern, that a matching line
+    must contain, encoded as they appear in the index.  Returns None if
+    some pattern has no literal long enough to look up.
+    """
+    literals = []
+    for pattern in patterns:
+        if fixed:
+            literal, caseless = pattern, ignore_case
+        else:
+            flags = re.IGNORECASE if ignore_case else 0
+            caseless = bool(re.compile(pattern, flags).flags & re.IGNORECASE)
+            literal = required_literal(pattern)
+
+        # The index only folds ASCII case
+        if caseless and not (literal.isascii() and
+                             not UNSAFE_CASELESS & set(literal)):
+            return None
+
+        literal = literal.encode('utf-8').lower()
+        if len(literal) < 3:
+            return None
+        literals.append(literal)
+    return literals
+
+
+def index_skip_set(directory, files, patterns, ignore_case=False,
+                   fixed=False):
+    """
+    Return the set of files that the index in a directory proves cannot
+    contain a match.  Files that are new, or whose size or mtime differ
+    from the index, are never skipped and so are simply rescanned.
+    """
+    literals = query_literals(patterns, ignore_case, fixed)
+    if literals is None:
+        return frozenset()
+
+    index = TrigramIndex(directory)
+    try:
+        matching = set()
+        for literal in literals:
+            candidates = None
+            for i in range(len(literal) - 2):
+                found = index.postings(literal[i:i + 3])
+                candidates = found if candidates is None else candidates & found
+                if not candidates:
+                    break
+            matching |= candidates
+
+        skip = set()
+        for path in files:
+            entry = index.files.get(os.path.relpath(path, directory))
+            if entry is None:
+                continue
+            file_id, size, mtime_ns = entry
+            try:
+                info = os.stat(path)
+            except OSError:
+                continue
+            if (info.st_size == size and info.st_mtime_ns == mtime_ns and
+                    file_id not in matching):
+                skip.add(path)
+    finally:
+        index.close()
+
+    return frozenset(skip)
+
+
+def error_message(filename, error):
+    """Format the error message for a file that could not be searched."""
+    if isinstance(error, FileNotFoundError):
+        return f"grep: {filename}: No such file or directory"
+    if isinstance(error, PermissionError):
+        return f"grep: {filename}: Permission denied"
+    return f"grep: {filename}: {error}"
+
+
+def format_line(display_name, line_number, line, show_filename=False,
+                show_line_numbers=False, separator=':'):
+    """
+    Build one line of output for a selected line, or for a context line
+    when separator is '-'.
+    """
+    output = []
+    if show_filename:
+        output.append(f"{display_name}{separator}")
+    if show_line_numbers:
+        output.append(f"{line_number}{separator}")
+    output.append(line)
+    return ''.join(output)
+
+
+def group_printer():
+    """
+    Return an emit() function that prints lines of output.  Context
+    output marks the start of each group with None; these become '--'
+    separators between groups, including groups from different files.
+    """
+    started = False
+
+    def emit(line, end='\n'):
+        nonlocal started
+        if line is None:
+            if started:
+                print('--')
+            return
+        started = True
+        print(line, end=end)
+
+    return emit
+
+
+def emit_summary(display_name, match_count, count_only=False,
+                 files_only=False, files_without_match=False,
+                 show_filename=False, emit=print):
+    """Output the per-file summary for -c, -l and -L."""
+    if count_only:
+        if show_filename:
+            emit(f"{display_name}:{match_count}")
+        else:
+            emit(str(match_count))
+
+    if files_only and match_count > 0:
+        emit(display_name)
+
+    if files_without_match and match_count == 0:
+        emit(display_name)
+
+
+def tag_lines(filename, regex, invert=False, null_data=False):
+    """
+    Yield (line_number, line, selected) for every line of a file, or
+    every NUL-terminated record with null_data.
+    """
+    eol = '\0' if null_data else '\n'
+    if filename == '-':
+        f = contextlib.nullcontext(sys.stdin.buffer if null_data
+                                   else sys.stdin)
+    else:
+        f = open(filename, 'rb' if null_data else 'r')
+
+    with f as stream:
+        lines = read_records(stream) if null_data else stream
+        line_number = 0
+        for line in lines:
+            line_number += 1
+            line = line.rstrip(eol)
+            selected = (regex.search(line) is not None) != invert
+            yield line_number, line, selected
+
+
+def context_lines(tagged, before=0, after=0, limit=None):
+    """
+    Filter (line_number, line, selected) records down to the selected
+    lines plus up to before/after lines of context around each, in a
+    single pass.  Overlapping windows merge, and None is yielded at the
+    start of each group of adjacent lines.  Leading context is kept in a
+    ring buffer and trailing context is a countdown, so memory is bounded
+    by the context size however long the stream runs.  After limit
+    selected lines, only their trailing context is still output.
+    """
+    pending = collections.deque(maxlen=before)
+    remaining = 0
+    matches = 0
+    last = None
+
+    for line_number, line, selected in tagged:
+        if selected and matches != limit:
+            matches += 1
+            records = list(pending)
+            records.append((line_number, line, True))
+            pending.clear()
+            remaining = after
+        elif remaining > 0:
+            records = [(line_number, line, False)]
+            remaining -= 1
+        else:
+            pending.append((line_number, line, False))
+            continue
+
+        for record in records:
+            if last is None or record[0] != last + 1:
+                yield None
+            yield record
+            last = record[0]
+
+        if matches == limit and remaining == 0:
+            break
+
+
+def discard(line, end='\n'):
+    """Output function for -q: print nothing."""
+
+
+def match_limit(max_count=None, count_only=False, files_only=False,
+                files_without_match=False, quiet=False):
+    """
+    Return how many selected lines are needed before the rest of a file
+    can be skipped, or None if it has to be read to the end.
+    """
+    if quiet or ((files_only or files_without_match) and not count_only):
+        # One match settles the answer
+        return 1 if max_count is None else min(max_count, 1)
+    return max_count
+
+
+def grep_file(filename, regex, find=None, invert=False,
+              show_line_numbers=False, count_only=False, files_only=False,
+              files_without_match=False, quiet=False, max_count=None,
+              before_context=None, after_context=None, null_data=False,
+              multiline=False, show_filename=False, skip=frozenset(),
+              emit=print):
+    """
+    Search one file, passing each line of output to emit().  Output
+    records end in NUL rather than newline with null_data.  Giving
+    either context size, even 0, separates non-adjacent groups of lines.
+    Reading stops once max_count lines are selected, or as soon as the
+    first match settles the answer for -l, -L and -q.  Files in skip are
+    known not to match and are not read.
+    Returns the number of selected lines.
+    """
+    if filename == '-':
+        display_name = '(standard input)'
+    else:
+        display_name = filename
+
+    if quiet:
+        emit = discard
+
+    match_count = 0
+    limit = match_limit(max_count, count_only, files_only,
+                        files_without_match, quiet)
+
+    print_lines = not (count_only or files_only or files_without_match)
+    context = print_lines and (before_context is not None or
+                               after_context is not None)
+    end = '\0' if null_data else '\n'
+
+    if filename not in skip and limit != 0 and context:
+        tagged = tag_lines(filename, regex, invert, null_data)
+        for record in context_lines(tagged, before_context or 0,
+                                    after_context or 0, limit):
+            if record is None:
+                emit(None)
+                continue
+            line_number, line, selected = record
+            if selected:
+                match_count += 1
+            emit(format_line(display_name, line_number, line, show_filename,
+                             show_line_numbers, ':' if selected else '-'),
+                 end=end)
+
+    elif filename not in skip and limit != 0:
+        for line_number, line_stripped in search_file(
+                filename, regex, find, invert, show_line_numbers,
+                null_data, multiline):
+            match_count += 1
+
+            if print_lines:
+                emit(format_line(display_name, line_number, line_stripped,
+                                 show_filename, show_line_numbers), end=end)
+
+            if match_count == limit:
+                break
+
+    emit_summary(display_name, match_count, count_only, files_only,
+                 files_without_match, show_filename, emit)
 
-                if matches:
-                    match_count += 1
-                    exit_status = 0  # Found at least one match
+    return match_count
 
-                    if count_only or files_only:
-                        continue
 
-                    # Build output line
-                    output = []
-                    if show_filename:
-                        output.append(f"{display_name}:")
-                    if show_line_numbers:
-                        output.append(f"{line_number}:")
-                    output.append(line_stripped)
+# Per-process search state for the -j worker pool
+worker_state = {}
 
-                    print(''.join(output))
 
-            if count_only:
-                if show_filename:
-                    print(f"{display_name}:{match_count}")
-                else:
-                    print(match_count)
+def init_worker(patterns, ignore_case, fixed, options):
+    """Compile the patterns once in each worker process."""
+    regex, find = compile_patterns(patterns, ignore_case, fixed,
+                                   options['null_data'], options['multiline'])
+    worker_state['regex'] = regex
+    worker_state['find'] = find
+    worker_state['options'] = options
 
-            if files_only and match_count > 0:
-                print(display_name)
 
-            if filename != '-':
-                f.close()
+def grep_worker(filename):
+    """
+    Search one file in a worker process.
+    Returns (output, match_count, error_message), where output holds
+    the (line, end) pairs to pass to emit().
+    """
+    output = []
 
-        except FileNotFoundError:
-            print(f"grep: {filename}: No such file or directory", file=sys.stderr)
+    def collect(line, end='\n'):
+        output.append((line, end))
+
+    try:
+        match_count = grep_file(filename, worker_state['regex'],
+                                worker_state['find'], emit=collect,
+                                **worker_state['options'])
+    except Exception as e:
+        return output, 0, error_message(filename, e)
+    return output, match_count, None
+
+
+def grep_chunk(chunk):
+    """
+    Search one byte range of a large file in a worker process.
+    Returns (selected_lines, match_count, newline_count); selected lines
+    are only collected when they will be printed, and newlines are only
+    counted when line numbers are wanted.
+    """
+    filename, start, end = chunk
+    regex = worker_state['regex']
+    find = worker_state['find']
+    options = worker_state['options']
+    invert = options['invert']
+    number_lines = options['show_line_numbers']
+    keep_lines = not (options['count_only'] or options['files_only'] or
+                      options['files_without_match'] or options['quiet'])
+    limit = match_limit(options['max_count'], options['count_only'],
+                        options['files_only'], options['files_without_match'],
+                        options['quiet'])
+
+    selected = []
+    match_count = 0
+    newlines = 0
+
+    with open(filename, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            if find is not None and not invert:
+                matches = scan_buffer(buf, find, regex, number_lines,
+                                      start, end)
+            else:
+                matches = scan_range(f, start, end, regex, invert)
+
+            for match in matches:
+                match_count += 1
+                if keep_lines:
+                    selected.append(match)
+                if match_count == limit:
+                    break
+
+            if number_lines:
+                newlines = count_newlines(buf, start, end)
+
+    return selected, match_count, newlines
+
+
+def ordered_results(executor, func, items, window):
+    """
+    Like executor.map, but keeps at most window tasks in flight so that
+    results waiting to be printed cannot pile up in memory.
+    """
+    pending = collections.deque()
+    for item in items:
+        pending.append(executor.submit(func, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def is_splittable(filename):
+    """Return True if a file is a regular file worth splitting into chunks."""
+    if filename == '-':
+        return False
+    info = os.stat(filename)
+    return stat.S_ISREG(info.st_mode) and info.st_size >= 2 * CHUNK_SIZE
+
+
+def grep_chunked(filename, patterns, ignore_case, fixed, options, jobs,
+                 emit=print):
+    """
+    Search one large regular file by splitting it into newline-aligned
+    chunks that worker processes scan concurrently.  Results are stitched
+    back together in order, with line numbers offset by the newline
+    counts of the preceding chunks, and no further chunks are read once
+    enough lines have been selected.  Returns the number of selected lines.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    if options['quiet']:
+        emit = discard
+
+    with open(filename, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            ranges = split_ranges(buf, CHUNK_SIZE)
+
+    match_count = 0
+    base_line = 0
+    limit = match_limit(options['max_count'], options['count_only'],
+                        options['files_only'], options['files_without_match'],
+                        options['quiet'])
+
+    executor = ProcessPoolExecutor(max_workers=jobs, initializer=init_worker,
+                                   initargs=(patterns, ignore_case, fixed,
+                                             options))
+    try:
+        chunks = ((filename, start, end) for start, end in ranges)
+        for selected, count, newlines in ordered_results(
+                executor, grep_chunk, chunks, 2 * jobs):
+            if limit is not None:
+                count = min(count, limit - match_count)
+                selected = selected[:count]
+            match_count += count
+            for line_number, line in selected:
+                emit(format_line(filename, base_line + line_number, line,
+                                 options['show_filename'],
+                                 options['show_line_numbers']))
+            base_line += newlines
+            if match_count == limit:
+                break
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+    emit_summary(filename, match_count, options['count_only'],
+                 options['files_only'], options['files_without_match'],
+                 options['show_filename'], emit)
+
+    return match_count
+
+
+def grep_parallel(patterns, ignore_case, fixed, files, options, jobs):
+    """
+    Search files concurrently in a pool of worker processes, yielding
+    (output_lines, match_count, error_message) in file order.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    chunksize = max(1, min(64, len(files) // (jobs * 4)))
+    executor = ProcessPoolExecutor(max_workers=jobs, initializer=init_worker,
+                                   initargs=(patterns, ignore_case, fixed,
+                                             options))
+    try:
+        yield from executor.map(grep_worker, files, chunksize=chunksize)
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+def grep(pattern, files, ignore_case=False, invert=False,
+         show_line_numbers=False, count_only=False,
+         suppress_filename=False, files_only=False, fixed=False,
+         recursive=False, jobs=1, pattern_file=None, index_dir=None,
+         max_count=None, quiet=False, files_without_match=False,
+         before_context=None, after_context=None, null_data=False,
+         multiline=False):
+
+    if pattern_file is not None:
+        try:
+            patterns = read_patterns(pattern_file)
+        except Exception as e:
+            print(error_message(pattern_file, e), file=sys.stderr)
             return 2
-        except PermissionError:
-            print(f"grep: {filename}: Permission denied", file=sys.stderr)
+    elif fixed:
+        # Each line of a fixed-string pattern is a separate string
+        patterns = pattern.split('\n')
+    else:
+        patterns = [pattern]
+
+    try:
+        regex, find = compile_patterns(patterns, ignore_case, fixed,
+                                       null_data, multiline)
+    except re.error as e:
+        print(f"grep: invalid pattern: {e}", file=sys.stderr)
+        return 2
+
+    # With an index and no files given, search everything it covers
+    whole_index = index_dir is not None and not files
+    if whole_index:
+        files = [index_dir]
+        recursive = True
+
+    # If no files specified, read from stdin (or the current directory)
+    implicit_dir = not files
+    if not files:
+        files = ['.'] if recursive else ['-']
+
+    # Determine if we should show filenames
+    show_filename = (len(files) > 1 or
+                     recursive and any(os.path.isdir(f) for f in files))
+    show_filename = show_filename and not suppress_filename
+
+    if whole_index:
+        files = index_files(index_dir)
+    else:
+        files = list(expand_files(files, recursive))
+    if recursive and implicit_dir:
+        files = [os.path.relpath(f) for f in files]
+
+    # Files the index proves cannot match are not read at all
+    skip = frozenset()
+    if index_dir is not None and not invert:
+        try:
+            skip = index_skip_set(index_dir, files, patterns, ignore_case,
+                                  fixed)
+        except Exception as e:
+            path = os.path.join(index_dir, INDEX_NAME)
+            print(error_message(path, e), file=sys.stderr)
             return 2
+
+    options = {
+        'invert': invert,
+        'show_line_numbers': show_line_numbers,
+        'count_only': count_only,
+        'files_only': files_only,
+        'files_without_match': files_without_match,
+        'quiet': quiet,
+        'max_count': max_count,
+        'before_context': before_context,
+        'after_context': after_context,
+        'null_data': null_data,
+        'multiline': multiline,
+        'show_filename': show_filename,
+        'skip': skip,
+    }
+
+    if jobs <= 0:
+        jobs = os.cpu_count() or 1
+
+    exit_status = 1  # Default: no matches found
+    emit = group_printer()
+
+    if jobs > 1 and len(files) > 1 and '-' not in files:
+        # Results come back in file order, so output is deterministic
+        for output, match_count, error in grep_parallel(
+                patterns, ignore_case, fixed, files, options, jobs):
+            for line, end in output:
+                emit(line, end)
+            if error:
+                print(error, file=sys.stderr)
+                return 2
+            if match_count > 0:
+                if quiet:
+                    return 0  # No need to look any further
+                exit_status = 0  # Found at least one match
+        return exit_status
+
+    for filename in files:
+        try:
+            # Context windows, records and multiline matches cannot
+            # cross chunk boundaries
+            if (jobs > 1 and filename not in skip and
+                    before_context is None and after_context is None and
+                    not (null_data or multiline) and
+                    is_splittable(filename)):
+                match_count = grep_chunked(filename, patterns, ignore_case,
+                                           fixed, options, jobs, emit)
+            else:
+                match_count = grep_file(filename, regex, find, emit=emit,
+                                        **options)
+            if match_count > 0:
+                if quiet:
+                    return 0  # No need to look any further
+                exit_status = 0  # Found at least one match
         except Exception as e:
-            print(f"grep: {filename}: {e}", file=sys.stderr)
+            print(error_message(filename, e), file=sys.stderr)
             return 2
 
     return exit_status
@@ -100,9 +1427,14 @@ def main():
     parser.add_argument('--help', action='help',
                         help='show this help message and exit')
 
-    parser.add_argument('pattern', help='pattern to search for')
+    parser.add_argument('pattern', nargs='?',
+                        help='pattern to search for (unless -f is given)')
     parser.add_argument('files', nargs='*', metavar='FILE',
                         help='files to search (default: stdin)')
+    parser.add_argument('-F', '--fixed-strings', action='store_true',
+                        help='interpret PATTERN as a fixed string')
+    parser.add_argument('-f', '--file', dest='pattern_file', metavar='FILE',
+                        help='take patterns from FILE, one per line')
     parser.add_argument('-i', '--ignore-case', action='store_true',
                         help='ignore case distinctions')
     parser.add_argument('-v', '--invert-match', action='store_true',
@@ -115,12 +1447,61 @@ def main():
                         help='suppress file names on output')
     parser.add_argument('-l', '--files-with-matches', action='store_true',
                         help='print only names of files with matches')
+    parser.add_argument('-L', '--files-without-match', action='store_true',
+                        help='print only names of files with no matches')
+    parser.add_argument('-m', '--max-count', type=int, metavar='NUM',
+                        help='stop reading a file after NUM selected lines')
+    parser.add_argument('-q', '--quiet', '--silent', action='store_true',
+                        help='print nothing; exit 0 on the first match')
+    parser.add_argument('-A', '--after-context', type=int, metavar='NUM',
+                        help='print NUM lines of trailing context')
+    parser.add_argument('-B', '--before-context', type=int, metavar='NUM',
+                        help='print NUM lines of leading context')
+    parser.add_argument('-C', '--context', type=int, metavar='NUM',
+                        help='print NUM lines of context on both sides')
+    parser.add_argument('-z', '--null-data', action='store_true',
+                        help='input and output records end in NUL, '
+                             'not newline')
+    parser.add_argument('--multiline', action='store_true',
+                        help='match across lines, printing each matching '
+                             'range of lines')
+    parser.add_argument('-r', '--recursive', action='store_true',
+                        help='search directories recursively')
+    parser.add_argument('-j', '--jobs', type=int, default=1, metavar='N',
+                        help='search N files at once (0 = one per CPU)')
+    parser.add_argument('--index-build', metavar='DIR',
+                        help='write a trigram index of the files under DIR')
+    parser.add_argument('--index', metavar='DIR',
+                        help='search the files under DIR, or only the '
+                             'FILEs given, using the index in DIR to skip '
+                             'files that cannot match')
 
     args = parser.parse_args()
 
+    if args.index_build is not None:
+        return build_index(args.index_build)
+
+    # With -f, the first operand is a file rather than the pattern
+    if args.pattern_file is not None:
+        if args.pattern is not None:
+            args.files.insert(0, args.pattern)
+    elif args.pattern is None:
+        parser.error('the following arguments are required: pattern')
+
+    # -A and -B override -C for their own side
+    after = args.context if args.after_context is None else args.after_context
+    before = (args.context if args.before_context is None
+              else args.before_context)
+
+    if args.multiline and (before is not None or after is not None):
+        parser.error('--multiline cannot be combined with context lines')
+
     return grep(args.pattern, args.files, args.ignore_case, args.invert_match,
                 args.line_number, args.count, args.no_filename,
-                args.files_with_matches)
+                args.files_with_matches, args.fixed_strings,
+                args.recursive, args.jobs, args.pattern_file, args.index,
+                args.max_count, args.quiet, args.files_without_match,
+                before, after, args.null_data, args.multiline)
 
 
 if __name__ == '__main__':
@@ -5,72 +5,1344 @@ Classic Unix sort implementation in Python
 """
 
 import sys
+import os
+import re
+import heapq
+import operator
+import shutil
+import random
 import argparse
+import itertools
+import string
+import tempfile
+from array import array
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
 
+try:
+    import resource
+except ImportError:
+    resource = None
 
-def sort_files(files, reverse=False, numeric=False, unique=False):
-    """Read all files and sort their lines."""
-    lines = []
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
-    for filename in files:
+
+# Memory used for buffered lines before they are sorted and spilled to a
+# run file, unless -S says otherwise
+DEFAULT_BUFFER_SIZE = 256 * 1024 * 1024
+
+# Most run files merged at once, before the open file limit is considered
+MERGE_FANIN = 64
+
+# Rough cost in bytes of holding one line in the buffer beyond its text:
+# the str object header and its list slot.  A line sorted by key costs
+# as much again for the key, which may be as long as the line.
+LINE_OVERHEAD = 64
+
+# Bytes per line sorted -n by NumPy for its key in a float64 array, its
+# index from the argsort, and the argsort's working space
+ARRAY_KEY_OVERHEAD = 24
+
+# Bytes per line held in a NumericBuffer for the offset of its text, in
+# place of the str object counted by LINE_OVERHEAD
+LINE_OFFSET_OVERHEAD = 8
+
+# Bytes of a --random-source file used to seed the shuffle
+RANDOM_SOURCE_BYTES = 1024 * 1024
+
+# Keys a shuffled line can be given, and the hex digits each is written
+# with in a bucket file
+SHUFFLE_KEYS = 1 << 64
+SHUFFLE_KEY_DIGITS = 16
+
+# Bytes per line shuffled without NumPy for its key in an array, and the
+# int objects and list slots of the key and index it is sorted by
+SHUFFLE_KEY_OVERHEAD = 88
+
+# Lines whose -n keys are parsed at a time, and then taken in sorted
+# order at a time, when NumPy does the sort
+NUMERIC_BATCH = 16384
+
+# Characters of input read at a time
+READ_SIZE = 1024 * 1024
+
+# Buffering for reading and writing run files
+RUN_BUFFER = 256 * 1024
+
+# Lines written to stdout per write call
+WRITE_BATCH = 4096
+
+# Fewest buffered lines worth handing to --parallel worker processes
+PARALLEL_MIN_LINES = 50000
+
+# Flags that may follow a -k field position
+KEY_FLAGS = set('bfhnrV')
+
+# Suffixes understood by -h, from smallest to largest
+HUMAN_SUFFIXES = 'KMGTPEZYRQ'
+HUMAN_NUMBER = re.compile(r'[ \t]*([-+]?(?:\d+\.?\d*|\.\d+))([kKMGTPEZYRQ]?)')
+
+# Runs of ASCII digits, compared as numbers by -V, and the file suffix
+# that -V sets aside until the rest ties, as GNU filevercmp does
+VERSION_DIGITS = re.compile(r'([0-9]+)')
+VERSION_SUFFIX = re.compile(r'(?:\.[A-Za-z~][A-Za-z0-9~]*)+\Z')
+
+# -V ranks of characters outside digit runs: letters by code, then any
+# other character after all letters, and ~ before everything, even the
+# end of a run
+VERSION_ORDER = {c: ord(c) for c in string.ascii_letters}
+VERSION_ORDER['~'] = -2
+VERSION_END = -1
+
+# A -k KEYDEF: F[.C][OPTS][,F[.C][OPTS]]
+KEY_DEFINITION = re.compile(r'(\d+)(?:\.(\d+))?([a-zA-Z]*)'
+                            r'(?:,(\d+)(?:\.(\d+))?([a-zA-Z]*))?\Z')
+
+# Multipliers for the suffixes accepted by -S
+SIZE_SUFFIXES = {'b': 1, 'k': 1 << 10, 'm': 1 << 20, 'g': 1 << 30,
+                 't': 1 << 40, 'p': 1 << 50, 'e': 1 << 60}
+
+
+class InputError(Exception):
+    """An error reading an input that is being read a line at a time."""
+
+    def __init__(self, filename, error):
+        super().__init__(filename, error)
+        self.filename = filename
+        self.error = error
+
+
+class TempFileError(OSError):
+    """A run file could not be written to the temporary directory."""
+
+
+def parse_size(text):
+    """
+    Parse a -S buffer size: a number with an optional suffix of b, K, M,
+    G, T, P or E (powers of 1024, K when none is given) or % of physical
+    memory.
+    """
+    value = text.strip()
+    suffix = value[-1:].lower()
+    try:
+        if suffix == '%':
+            pages = os.sysconf('SC_PHYS_PAGES')
+            page_size = os.sysconf('SC_PAGE_SIZE')
+            size = int(float(value[:-1]) / 100 * pages * page_size)
+        elif suffix in SIZE_SUFFIXES:
+            size = int(float(value[:-1]) * SIZE_SUFFIXES[suffix])
+        else:
+            size = int(float(value) * SIZE_SUFFIXES['k'])
+    except (ValueError, OSError):
+        raise argparse.ArgumentTypeError(f"invalid buffer size: '{text}'")
+
+    if size < 1:
+        raise argparse.ArgumentTypeError(f"invalid buffer size: '{text}'")
+    return size
+
+
+def numeric_key(line):
+    """
+    Numeric sort key: the first word as a number, or 0.  NaN is not a
+    number either, and is 0 so that it has a place in the order.
+    """
+    words = line.split(None, 1)
+    try:
+        number = float(words[0]) if words else 0
+    except ValueError:
+        return 0
+    return number if number == number else 0
+
+
+def parse_numbers(lines):
+    """
+    Parse the numeric sort keys of a block of lines at once into an
+    array('d').  When every line is a lone number, as in metric dumps,
+    the block is converted with float() in a single pass; otherwise
+    each line goes through numeric_key.
+    """
+    try:
+        # A line that float() accepts whole is just its first word
+        numbers = array('d', map(float, lines))
+    except ValueError:
+        return array('d', map(numeric_key, lines))
+
+    # Any NaN makes the sum NaN
+    total = sum(numbers)
+    if total != total:
+        numbers = array('d', map(numeric_key, lines))
+    return numbers
+
+
+def human_key(text):
+    """
+    Human numeric sort key for sizes like 2K or 1.5G: the sign first, then
+    the suffix, then the number, so that 1M sorts after 1023K.
+    """
+    match = HUMAN_NUMBER.match(text)
+    if not match:
+        return 0, 0, 0.0
+
+    value = float(match.group(1))
+    suffix = match.group(2).upper()
+    power = HUMAN_SUFFIXES.index(suffix) + 1 if suffix else 0
+    if value > 0:
+        return 1, power, value
+    if value < 0:
+        return -1, -power, value
+    return 0, 0, 0.0
+
+
+def version_parts(text):
+    """
+    Key comparing as Debian's verrevcmp does: runs of digits as numbers,
+    with a missing run counting as 0, and the text between them a
+    character at a time by VERSION_ORDER, each stretch ended by
+    VERSION_END.  Each number is paired with the rank of the character
+    after it, and every key ends in the (0, VERSION_END) that the
+    end of the text stands for, so that a key running out first still
+    compares as verrevcmp would against the rest of the longer one.
+    """
+    parts = VERSION_DIGITS.split(text)
+    if len(parts) > 1 and not parts[-1] and not int(parts[-2]):
+        # A trailing run of zeros is the same as none
+        del parts[-2:]
+    key = []
+    for i in range(0, len(parts), 2):
+        run = [VERSION_ORDER.get(c, ord(c) + 256) for c in parts[i]]
+        run.append(VERSION_END)
+        if i:
+            key.append((int(parts[i - 1]), run[0]))
+        key += run
+    key.append((0, VERSION_END))
+    return tuple(key)
+
+
+def version_key(text):
+    """
+    Version sort key ordering lines as GNU filevercmp does.  Empty text
+    comes first, then ".", "..", and other text starting with a dot.  A
+    file suffix such as .tar.gz is left out of the first comparison and
+    only breaks ties.
+    """
+    if not text:
+        return 0,
+    if text[0] == '.':
+        if text in ('.', '..'):
+            return len(text),
+        rank = 3
+    else:
+        rank = 4
+    suffix = VERSION_SUFFIX.search(text)
+    if suffix is None:
+        parts = version_parts(text)
+        return rank, parts, parts
+    return rank, version_parts(text[:suffix.start()]), version_parts(text)
+
+
+class KeyDef:
+    """
+    One -k key: the field and character where it starts, where it ends
+    (end_field None for the end of the line, end_char 0 for the end of
+    the field), whether leading blanks are skipped before each
+    position, and its ordering flags.
+    """
+
+    def __init__(self, start_field=1, start_char=1, end_field=None,
+                 end_char=0, flags='', start_blanks=False,
+                 end_blanks=False):
+        self.start_field = start_field
+        self.start_char = start_char
+        self.end_field = end_field
+        self.end_char = end_char
+        self.flags = set(flags)
+        self.start_blanks = start_blanks
+        self.end_blanks = end_blanks
+
+    def has_options(self):
+        """Return True if the key was given any flags of its own."""
+        return bool(self.flags or self.start_blanks or self.end_blanks)
+
+
+def parse_key(text):
+    """Parse a -k KEYDEF of the form F[.C][OPTS][,F[.C][OPTS]]."""
+    match = KEY_DEFINITION.match(text)
+    if not match:
+        raise argparse.ArgumentTypeError(f"invalid key definition: '{text}'")
+
+    start_field, start_char, start_flags, end_field, end_char, end_flags = \
+        match.groups()
+    flags = set(start_flags) | set(end_flags or '')
+
+    if int(start_field) == 0:
+        raise argparse.ArgumentTypeError(
+            f"invalid key definition: '{text}': field number is zero")
+    if start_char is not None and int(start_char) == 0:
+        raise argparse.ArgumentTypeError(
+            f"invalid key definition: '{text}': character offset is zero")
+    if end_field is not None and int(end_field) == 0:
+        raise argparse.ArgumentTypeError(
+            f"invalid key definition: '{text}': field number is zero")
+    if not flags <= KEY_FLAGS:
+        raise argparse.ArgumentTypeError(
+            f"invalid key definition: '{text}': unknown option "
+            f"'{min(flags - KEY_FLAGS)}'")
+    if len(flags & set('nhV')) > 1:
+        raise argparse.ArgumentTypeError(
+            f"invalid key definition: '{text}': options "
+            f"'{''.join(sorted(flags & set('nhV')))}' are incompatible")
+
+    return KeyDef(int(start_field), int(start_char or 1),
+                  int(end_field) if end_field else None, int(end_char or 0),
+                  flags - {'b'}, 'b' in start_flags,
+                  'b' in (end_flags or ''))
+
+
+def field_prefix(count, separator):
+    """Regular expression matching the first count fields of a line."""
+    if separator is None:
+        # Each field is its leading blanks and then non-blanks
+        return '(?:[ \t]*[^ \t]*){%d}' % count
+    sep = re.escape(separator)
+    return r'(?:[^%s]*(?:%s|\Z)){%d}' % (sep, sep, count)
+
+
+def split_rest(separator, index, line):
+    """Key from field index + 1 to the end of the line."""
+    parts = line.split(separator, index)
+    return parts[index] if len(parts) > index else ''
+
+
+def split_field(separator, index, line):
+    """Key that is exactly field index + 1."""
+    parts = line.split(separator, index + 1)
+    return parts[index] if len(parts) > index else ''
+
+
+def split_fields(separator, start, end, line):
+    """Key from field start + 1 through field end, separators included."""
+    return separator.join(line.split(separator, end)[start:end])
+
+
+def slice_key(start_match, end_match, line):
+    """Key between the ends of two position matches, or to end of line."""
+    start = start_match(line).end()
+    end = end_match(line).end() if end_match is not None else len(line)
+    return line[start:end] if end > start else ''
+
+
+def compose(outer, inner, line):
+    """Apply outer to the result of inner."""
+    return outer(inner(line))
+
+
+def key_tuple(extractors, line):
+    """Compute every key of a line, in order."""
+    return tuple([extract(line) for extract in extractors])
+
+
+class Descending:
+    """Wrap a key so that it sorts in the opposite direction."""
+
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other):
+        return other.value < self.value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+
+def field_extractor(keydef, separator):
+    """
+    Compile the position part of a key definition into a function that
+    returns the text of the key, or None if the key is the whole line.
+    Whole -t fields are cut with str.split; anything else is located
+    with regular expressions built once for the key.
+    """
+    start = keydef.start_field - 1
+    end = keydef.end_field
+
+    whole_fields = (keydef.start_char == 1 and not keydef.start_blanks and
+                    keydef.end_char == 0)
+    if whole_fields and start == 0 and end is None:
+        return None
+
+    if separator is not None and whole_fields and \
+            (end is None or end >= keydef.start_field):
+        if end is None:
+            return partial(split_rest, separator, start)
+        if end == keydef.start_field:
+            return partial(split_field, separator, start)
+        return partial(split_fields, separator, start, end)
+
+    pattern = field_prefix(start, separator)
+    if keydef.start_blanks:
+        pattern += '[ \t]*'
+    pattern += '.{0,%d}' % (keydef.start_char - 1)
+    start_match = re.compile(pattern, re.DOTALL).match
+
+    end_match = None
+    if end is not None:
+        pattern = field_prefix(end - 1, separator)
+        if keydef.end_char == 0:
+            if separator is None:
+                pattern += '[ \t]*[^ \t]*'
+            else:
+                pattern += '[^%s]*' % re.escape(separator)
+        else:
+            if keydef.end_blanks:
+                pattern += '[ \t]*'
+            pattern += '.{0,%d}' % keydef.end_char
+        end_match = re.compile(pattern, re.DOTALL).match
+
+    return partial(slice_key, start_match, end_match)
+
+
+def compile_key(keydef, separator):
+    """
+    Compile a key definition into a function returning its sort key for
+    a line, or None if lines compare whole.
+    """
+    extract = field_extractor(keydef, separator)
+    transforms = []
+    if 'f' in keydef.flags and 'n' not in keydef.flags and \
+            'h' not in keydef.flags:
+        transforms.append(str.upper)
+    if 'n' in keydef.flags:
+        transforms.append(numeric_key)
+    elif 'h' in keydef.flags:
+        transforms.append(human_key)
+    elif 'V' in keydef.flags:
+        transforms.append(version_key)
+
+    for transform in transforms:
+        extract = transform if extract is None else \
+            partial(compose, transform, extract)
+    return extract
+
+
+def make_key(keydefs, separator=None):
+    """
+    Compile -k key definitions into a single key function, so that every
+    key of a line is computed once, before sorting.  Returns (key,
+    reverse): when all keys sort in the same direction the sort itself
+    is reversed, otherwise descending keys are negated or wrapped.
+    """
+    extractors = [compile_key(keydef, separator) or str
+                  for keydef in keydefs]
+    descending = ['r' in keydef.flags for keydef in keydefs]
+
+    reverse = all(descending)
+    if any(descending) and not reverse:
+        for i, keydef in enumerate(keydefs):
+            if descending[i]:
+                negate = operator.neg if 'n' in keydef.flags else Descending
+                extractors[i] = partial(compose, negate, extractors[i])
+
+    if len(extractors) > 1:
+        return partial(key_tuple, tuple(extractors)), reverse
+    if extractors[0] is str:
+        return None, reverse
+    return extractors[0], reverse
+
+
+def merge_fanin(limit=MERGE_FANIN):
+    """Most run files to merge at once without running out of descriptors."""
+    if resource is not None:
+        soft, _ = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if soft != resource.RLIM_INFINITY:
+            # Leave room for stdio, the inputs and the output run
+            limit = min(limit, soft - 16)
+    return max(limit, 2)
+
+
+def read_run(path):
+    """Yield the lines of a run file, without their newlines."""
+    with open(path, 'r', encoding='utf-8', errors='surrogatepass',
+              newline='\n', buffering=RUN_BUFFER) as f:
+        for line in f:
+            yield line[:-1]
+
+
+# Per-process sort settings for the --parallel worker pool
+worker_state = {}
+
+
+def init_worker(key, reverse):
+    """Record the sort key and direction once in each worker process."""
+    worker_state['key'] = key
+    worker_state['reverse'] = reverse
+
+
+def sort_block(block):
+    """
+    Sort one partition in a worker process.  The partition arrives as a
+    single UTF-8 block of newline-separated lines and the result goes
+    back as the sorted order of their indexes, packed in an array, along
+    with their keys in that order packed by pack_keys, so no per-line
+    objects cross between processes.
+    """
+    lines = block.decode('utf-8', 'surrogatepass').split('\n')
+    key = worker_state['key']
+    keys = lines if key is None else list(map(key, lines))
+    order = sorted(range(len(lines)), key=keys.__getitem__,
+                   reverse=worker_state['reverse'])
+    packed = None if key is None else pack_keys([keys[i] for i in order])
+    return array('I', order).tobytes(), packed
+
+
+def pack_keys(keys):
+    """
+    Pack a list of sort keys into bytes: numbers as an array('d') tagged
+    'd', text as newline-separated UTF-8 tagged 's'.  Returns None for
+    any other kind of key, such as the tuples of several -k keys.
+    """
+    try:
+        return 'd', array('d', keys).tobytes()
+    except TypeError:
+        pass
+    try:
+        return 's', '\n'.join(keys).encode('utf-8', 'surrogatepass')
+    except TypeError:
+        return None
+
+
+def unpack_keys(packed):
+    """Turn keys packed by pack_keys back into a list."""
+    kind, data = packed
+    if kind == 's':
+        return data.decode('utf-8', 'surrogatepass').split('\n')
+    keys = array('d')
+    keys.frombytes(data)
+    return keys.tolist()
+
+
+class NumericBuffer:
+    """
+    Lines buffered for a -n sort by NumPy, held without an object per
+    line: their text as the blocks it was read in, an array('q') of the
+    offset where each line starts (and where the next would), and an
+    array('d') of their keys, parsed a batch at a time as each block
+    arrives.  Lines become strings again only on their way out.
+    """
+
+    def __init__(self):
+        self.blocks = []
+        self.block_starts = []
+        self.length = 0
+        self.bounds = array('q', [0])
+        self.numbers = array('d')
+
+    def __len__(self):
+        return len(self.numbers)
+
+    def extend(self, text, lines):
+        """Add a block of whole lines, along with the lines split from it."""
+        for start in range(0, len(lines), NUMERIC_BATCH):
+            self.numbers.extend(
+                parse_numbers(lines[start:start + NUMERIC_BATCH]))
+        # Each line starts just past the newline of the one before
+        ends = itertools.accumulate(map((1).__add__, map(len, lines)),
+                                    initial=self.length)
+        self.bounds.extend(itertools.islice(ends, 1, None))
+        self.blocks.append(text)
+        self.block_starts.append(self.length)
+        self.length += len(text)
+
+    def sorted(self, reverse=False):
+        """
+        Yield the lines in -n order, by a stable argsort of the keys, on
+        the negated keys for reverse so that ties keep their input order.
+        """
+        if not self.numbers:
+            return
+        keys = numpy.frombuffer(self.numbers, dtype=numpy.float64)
+        if reverse:
+            keys = -keys
+        order = numpy.argsort(keys, kind='stable')
+        del keys
+        bounds = numpy.frombuffer(self.bounds, dtype=numpy.int64)
+        block_starts = numpy.array(self.block_starts, dtype=numpy.int64)
+        blocks = self.blocks
+        for start in range(0, len(order), NUMERIC_BATCH):
+            chosen = order[start:start + NUMERIC_BATCH]
+            starts = bounds[chosen]
+            which = numpy.searchsorted(block_starts, starts, 'right') - 1
+            offsets = block_starts[which]
+            yield from [blocks[block][first:last] for block, first, last in
+                        zip(which.tolist(), (starts - offsets).tolist(),
+                            (bounds[chosen + 1] - 1 - offsets).tolist())]
+
+
+def take_order(lines, order):
+    """Yield lines in the order of a NumPy array of indexes."""
+    for start in range(0, len(order), NUMERIC_BATCH):
+        chosen = order[start:start + NUMERIC_BATCH].tolist()
+        yield from map(lines.__getitem__, chosen)
+
+
+class ExternalSorter:
+    """
+    Sort lines that may not fit in memory.  Lines are buffered until their
+    estimated size reaches buffer_size, then sorted and spilled to a run
+    file in a temporary directory under tmpdir.  The runs, and whatever
+    is left in the buffer, are k-way merged with heapq.merge, which
+    keeps the sort stable across runs.  When there are more runs than
+    can be opened at once, consecutive groups of them are merged into
+    longer runs first.
+
+    With jobs above 1, each buffer is split into contiguous partitions
+    that worker processes sort, and a final stable sort merges the
+    sorted partitions, giving exactly the order a serial sort would.
+    """
+
+    def __init__(self, key=None, reverse=False, buffer_size=None,
+                 tmpdir=None, fanin=None, jobs=1):
+        self.key = key
+        self.reverse = reverse
+        self.buffer_size = buffer_size or DEFAULT_BUFFER_SIZE
+        self.tmpdir = tmpdir
+        self.fanin = max(fanin or merge_fanin(), 2)
+        self.lines = []
+        self.numbers = None
+        self.size = 0
+        self.text_weight = 1 if key is None else 2
+        self.line_cost = LINE_OVERHEAD * self.text_weight
+        if key is numeric_key and numpy is not None:
+            # NumPy sorts -n lines held compactly, keys and all
+            self.numbers = NumericBuffer()
+            self.text_weight = 1
+            self.line_cost = ARRAY_KEY_OVERHEAD + LINE_OFFSET_OVERHEAD
+        self.runs = []
+        self.run_dir = None
+        self.jobs = jobs
+        self.executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Remove the run files and stop any worker processes."""
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
+        if self.run_dir is not None:
+            shutil.rmtree(self.run_dir, ignore_errors=True)
+            self.run_dir = None
+
+    def extend(self, text):
+        """
+        Buffer a block of whole lines, each ending in a newline, spilling
+        the buffer when it is full.
+        """
+        lines = text.split('\n')
+        lines.pop()
+        if self.numbers is not None:
+            self.numbers.extend(text, lines)
+        else:
+            self.lines += lines
+        self.size += len(text) * self.text_weight + \
+            self.line_cost * len(lines)
+        if self.size >= self.buffer_size:
+            self.spill()
+
+    def write_run(self, lines):
+        """Write sorted lines to a new run file and return its path."""
         try:
-            if filename == '-':
-                f = sys.stdin
+            if self.run_dir is None:
+                self.run_dir = tempfile.mkdtemp(prefix='sort',
+                                                dir=self.tmpdir)
+            fd, path = tempfile.mkstemp(prefix='run', dir=self.run_dir)
+            with open(fd, 'w', encoding='utf-8', errors='surrogatepass',
+                      newline='\n', buffering=RUN_BUFFER) as f:
+                for batch in batched(lines, WRITE_BATCH):
+                    batch.append('')
+                    f.write('\n'.join(batch))
+        except TempFileError:
+            raise
+        except OSError as e:
+            directory = self.run_dir or self.tmpdir or tempfile.gettempdir()
+            raise TempFileError(e.errno, e.strerror, directory) from e
+        return path
+
+    def sort_buffer(self):
+        """
+        Empty the buffer and return its lines in sorted order, sorting in
+        worker processes if there are many.  Lines in a NumericBuffer,
+        their keys already parsed, are always sorted here.
+        """
+        self.size = 0
+        if self.numbers is not None:
+            numbers = self.numbers
+            self.numbers = NumericBuffer()
+            return numbers.sorted(self.reverse)
+
+        lines = self.lines
+        self.lines = []
+        if self.jobs < 2 or len(lines) < PARALLEL_MIN_LINES:
+            lines.sort(key=self.key, reverse=self.reverse)
+            return lines
+
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.jobs, initializer=init_worker,
+                initargs=(self.key, self.reverse))
+
+        step = -(-len(lines) // self.jobs)
+        partitions = [lines[start:start + step]
+                      for start in range(0, len(lines), step)]
+        del lines
+        blocks = ('\n'.join(part).encode('utf-8', 'surrogatepass')
+                  for part in partitions)
+
+        merged = []
+        keys = []
+        for part, (packed, packed_keys) in zip(
+                partitions, self.executor.map(sort_block, blocks)):
+            order = array('I')
+            order.frombytes(packed)
+            merged.extend(map(part.__getitem__, order))
+            if packed_keys is None:
+                keys = None
+            elif keys is not None:
+                keys.extend(unpack_keys(packed_keys))
+
+        # The partitions are sorted runs in input order, which the
+        # stable sort merges without disturbing equal keys.  Keys the
+        # workers sent back are merged by index rather than computed again
+        if keys is None:
+            merged.sort(key=self.key, reverse=self.reverse)
+            return merged
+        order = sorted(range(len(keys)), key=keys.__getitem__,
+                       reverse=self.reverse)
+        return list(map(merged.__getitem__, order))
+
+    def spill(self):
+        """Sort the buffered lines and write them out as a run."""
+        self.runs.append(self.write_run(self.sort_buffer()))
+
+    def merge(self, sources):
+        """Merge sorted iterables of lines into one sorted iterator."""
+        return heapq.merge(*sources, key=self.key, reverse=self.reverse)
+
+    def sorted_lines(self):
+        """Return an iterator over every line added, in sorted order."""
+        lines = self.sort_buffer()
+        if not self.runs:
+            return iter(lines)
+
+        # Merge runs in consecutive groups until one pass can take them
+        # all, along with the lines still in memory
+        runs = self.runs
+        while len(runs) + 1 > self.fanin:
+            merged = []
+            for start in range(0, len(runs), self.fanin):
+                group = runs[start:start + self.fanin]
+                if len(group) == 1:
+                    merged.extend(group)
+                    continue
+                merged.append(self.write_run(
+                    self.merge(read_run(path) for path in group)))
+                for path in group:
+                    os.unlink(path)
+            runs = merged
+
+        sources = [read_run(path) for path in runs]
+        sources.append(lines)
+        return self.merge(sources)
+
+
+class ExternalShuffler:
+    """
+    Shuffle lines that may not fit in memory.  Every line is given a
+    64-bit key drawn from rng in input order, and the lines come out
+    sorted by key, in input order should two keys ever match.  That
+    gives every order of the lines the same chance and makes the order
+    depend on the seed alone, not on buffer_size or fanin.  Lines are
+    held in a list until they reach buffer_size bytes; from then on
+    every line is written, after its key in hex, to the one of fanin
+    bucket files in a temporary directory under tmpdir that covers its
+    key.  Each bucket is then sorted in memory, or scattered again over
+    its own keys if it is still too big, and the buckets are written
+    out in key order.
+    """
+
+    def __init__(self, rng, buffer_size=None, tmpdir=None, fanin=None):
+        self.rng = rng
+        self.buffer_size = buffer_size or DEFAULT_BUFFER_SIZE
+        self.tmpdir = tmpdir
+        self.fanin = max(fanin or merge_fanin(), 2)
+        # Estimated bytes of memory per line beyond its text
+        key_cost = SHUFFLE_KEY_OVERHEAD if numpy is None else \
+            ARRAY_KEY_OVERHEAD
+        self.line_cost = LINE_OVERHEAD + key_cost
+        self.lines = []
+        self.keys = array('Q')
+        self.size = 0
+        self.chars = 0
+        self.buckets = None
+        self.bucket_dir = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Close and remove the bucket files."""
+        if self.buckets is not None:
+            for _, f in self.buckets:
+                f.close()
+            self.buckets = None
+        if self.bucket_dir is not None:
+            shutil.rmtree(self.bucket_dir, ignore_errors=True)
+            self.bucket_dir = None
+
+    def random_keys(self, count):
+        """
+        Draw the keys of the next count lines.  The random stream is read
+        eight bytes a line, so the keys do not depend on how the lines
+        are batched.
+        """
+        keys = array('Q', self.rng.randbytes(8 * count))
+        if sys.byteorder == 'big':
+            keys.byteswap()
+        return keys
+
+    def extend(self, text):
+        """
+        Add a block of whole lines, each ending in a newline, scattering
+        them to buckets once memory is full.
+        """
+        lines = text.split('\n')
+        lines.pop()
+        keys = self.random_keys(len(lines))
+        if self.buckets is not None:
+            self.scatter(lines, keys, self.buckets, 0, SHUFFLE_KEYS)
+            return
+
+        self.lines.extend(lines)
+        self.keys.extend(keys)
+        self.chars += len(text)
+        self.size += len(text) + self.line_cost * len(lines)
+        if self.size >= self.buffer_size:
+            self.buckets = self.open_buckets()
+            self.scatter(self.lines, self.keys, self.buckets, 0,
+                         SHUFFLE_KEYS)
+            self.lines = []
+            self.keys = array('Q')
+
+    def open_buckets(self):
+        """Create fanin empty bucket files, returning (path, file) pairs."""
+        buckets = []
+        try:
+            if self.bucket_dir is None:
+                self.bucket_dir = tempfile.mkdtemp(prefix='sort',
+                                                   dir=self.tmpdir)
+            for _ in range(self.fanin):
+                fd, path = tempfile.mkstemp(prefix='bucket',
+                                            dir=self.bucket_dir)
+                buckets.append((path, open(
+                    fd, 'w', encoding='utf-8', errors='surrogatepass',
+                    newline='\n', buffering=RUN_BUFFER)))
+        except OSError as e:
+            for _, f in buckets:
+                f.close()
+            directory = self.bucket_dir or self.tmpdir or \
+                tempfile.gettempdir()
+            raise TempFileError(e.errno, e.strerror, directory) from e
+        return buckets
+
+    def scatter(self, lines, keys, buckets, low, width, tagged=False):
+        """
+        Append each of a list of lines to the bucket covering its key, the
+        buckets splitting the width keys from low evenly.  Lines not yet
+        tagged are written after their key in hex and a tab.
+        """
+        count = len(buckets)
+        for start in range(0, len(lines), WRITE_BATCH):
+            batch = zip(keys[start:start + WRITE_BATCH],
+                        lines[start:start + WRITE_BATCH])
+            parts = [[] for _ in buckets]
+            if tagged:
+                for key, line in batch:
+                    parts[(key - low) * count // width].append(line)
             else:
-                f = open(filename, 'r')
+                for key, line in batch:
+                    parts[(key - low) * count // width].append(
+                        '%016x\t%s' % (key, line))
+            try:
+                for (_, f), part in zip(buckets, parts):
+                    if part:
+                        part.append('')
+                        f.write('\n'.join(part))
+            except OSError as e:
+                raise TempFileError(e.errno, e.strerror,
+                                    self.bucket_dir) from e
 
-            for line in f:
-                lines.append(line.rstrip('\n'))
+    def shuffled_lines(self):
+        """Return an iterator over every line added, in random order."""
+        if self.buckets is None:
+            lines, keys = self.lines, self.keys
+            self.lines = []
+            self.keys = array('Q')
+            if numpy is not None:
+                keys = numpy.frombuffer(keys, dtype=numpy.uint64)
+                return take_order(lines, numpy.argsort(keys, kind='stable'))
+            order = sorted(range(len(keys)), key=keys.__getitem__)
+            del keys
+            return map(lines.__getitem__, order)
 
-            if filename != '-':
+        buckets = self.buckets
+        self.buckets = None
+        try:
+            for _, f in buckets:
                 f.close()
+        except OSError as e:
+            raise TempFileError(e.errno, e.strerror,
+                                self.bucket_dir) from e
+        return self.drain([path for path, _ in buckets], 0, SHUFFLE_KEYS,
+                          float('inf'))
 
-        except FileNotFoundError:
-            print(f"sort: cannot read: {filename}: No such file or directory",
-                  file=sys.stderr)
-            return 2
-        except PermissionError:
-            print(f"sort: cannot read: {filename}: Permission denied",
-                  file=sys.stderr)
-            return 2
+    def drain(self, paths, low, width, parent_size):
+        """
+        Yield the lines of each bucket file, which between them cover the
+        width keys from low, in key order, removing the files as they
+        are used up.  A bucket too big for memory is scattered into new
+        buckets over its own keys, as long as that makes it smaller than
+        the bucket it came from.
+        """
+        # Memory taken by a line for each character of it, as measured
+        # before the first scatter
+        expansion = self.size / max(self.chars, 1)
+        count = len(paths)
+        for index, path in enumerate(paths):
+            start = low - (-index * width // count)
+            stop = low - (-(index + 1) * width // count)
+            size = os.path.getsize(path)
+            if size * expansion >= self.buffer_size and size < parent_size:
+                buckets = self.open_buckets()
+                try:
+                    for tagged in batched(read_run(path), WRITE_BATCH):
+                        keys = [int(line[:SHUFFLE_KEY_DIGITS], 16)
+                                for line in tagged]
+                        self.scatter(tagged, keys, buckets, start,
+                                     stop - start, True)
+                finally:
+                    for _, f in buckets:
+                        f.close()
+                os.unlink(path)
+                yield from self.drain([path for path, _ in buckets], start,
+                                      stop - start, size)
+                continue
+
+            # Fixed-width hex sorts as the keys do, and the stable sort
+            # keeps lines with the same key in input order
+            tagged = list(read_run(path))
+            os.unlink(path)
+            tagged.sort(key=operator.itemgetter(slice(SHUFFLE_KEY_DIGITS)))
+            for line in tagged:
+                yield line[SHUFFLE_KEY_DIGITS + 1:]
+            del tagged
+
+
+def read_blocks(f, size=None):
+    """
+    Read a text stream in blocks of whole lines, each ending in a newline.
+    A last line without one is given one.
+    """
+    partial = ''
+    while True:
+        text = f.read(size or READ_SIZE)
+        if not text:
+            break
+        end = text.rfind('\n') + 1
+        if not end:
+            partial += text
+            continue
+        yield partial + text[:end]
+        partial = text[end:]
+
+    if partial:
+        yield partial + '\n'
+
+
+def read_lines(filename, f):
+    """
+    Yield the lines of an open input, without their newlines.  Errors
+    while reading are raised as InputError, naming the file.
+    """
+    try:
+        for line in f:
+            yield line.rstrip('\n')
+    except Exception as e:
+        raise InputError(filename, e) from e
+
+
+def open_input(filename):
+    """Open a file to sort, or return stdin for '-'."""
+    if filename == '-':
+        return sys.stdin
+    return open(filename, 'r')
+
+
+def input_lines(files):
+    """
+    Yield the lines of each file in turn, without their newlines.  Errors
+    opening or reading a file are raised as InputError.
+    """
+    for filename in files:
+        try:
+            f = open_input(filename)
         except Exception as e:
-            print(f"sort: {filename}: {e}", file=sys.stderr)
-            return 2
+            raise InputError(filename, e) from e
+        try:
+            yield from read_lines(filename, f)
+        finally:
+            if filename != '-':
+                f.close()
 
-    # Sort the lines
-    if numeric:
-        # Numeric sort - try to convert to number, fallback to 0
-        def numeric_key(line):
-            try:
-                return float(line.split()[0] if line.split() else '0')
-            except (ValueError, IndexError):
-                return 0
-        lines.sort(key=numeric_key, reverse=reverse)
+
+def input_error(filename, e):
+    """Report an error reading an input and return the exit status."""
+    if isinstance(e, FileNotFoundError):
+        print(f"sort: cannot read: {filename}: No such file or directory",
+              file=sys.stderr)
+    elif isinstance(e, PermissionError):
+        print(f"sort: cannot read: {filename}: Permission denied",
+              file=sys.stderr)
     else:
-        lines.sort(reverse=reverse)
+        print(f"sort: {filename}: {e}", file=sys.stderr)
+    return 2
 
-    # Remove duplicates if unique flag is set
-    if unique:
-        seen = set()
-        unique_lines = []
+
+def batched(iterable, size):
+    """Yield lists of up to size items from an iterable."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def unique_lines(lines, key=None):
+    """
+    Drop repeated lines from sorted output, keeping the first of each.
+    Equal lines always have equal keys, so only lines within one run of
+    equal keys need to be remembered.
+    """
+    if key is None:
+        previous = object()
         for line in lines:
+            if line != previous:
+                yield line
+                previous = line
+        return
+
+    for _, group in itertools.groupby(lines, key):
+        seen = set()
+        for line in group:
             if line not in seen:
                 seen.add(line)
-                unique_lines.append(line)
-        lines = unique_lines
+                yield line
+
+
+def write_lines(lines):
+    """Write lines to stdout, each followed by a newline."""
+    write = sys.stdout.write
+    for batch in batched(lines, WRITE_BATCH):
+        batch.append('')
+        write('\n'.join(batch))
+
+
+def merge_files(files, key=None, reverse=False, unique=False, tmpdir=None,
+                batch_size=None):
+    """
+    Merge files that are each already sorted, streaming a line at a time
+    from every one of them.  With more files than can be open at once,
+    consecutive groups of them are merged into run files first, and the
+    runs merged as they would be after a sort.
+    """
+    with ExternalSorter(key, reverse, tmpdir=tmpdir,
+                        fanin=batch_size) as sorter:
+        groups = list(batched(files, sorter.fanin))
+        opened = []
+        try:
+            for group in groups:
+                for filename in group:
+                    try:
+                        opened.append((filename, open_input(filename)))
+                    except Exception as e:
+                        return input_error(filename, e)
+
+                lines = sorter.merge(read_lines(filename, f)
+                                     for filename, f in opened)
+                if len(groups) > 1:
+                    sorter.runs.append(sorter.write_run(lines))
+                    close_inputs(opened)
+
+            if len(groups) > 1:
+                lines = sorter.sorted_lines()
+            if unique:
+                lines = unique_lines(lines, key)
+            write_lines(lines)
+
+        except InputError as e:
+            return input_error(e.filename, e.error)
+        except TempFileError as e:
+            print(f"sort: cannot create temporary file in "
+                  f"'{e.filename}': {e.strerror}", file=sys.stderr)
+            return 2
+        finally:
+            close_inputs(opened)
+
+    return 0
+
+
+def close_inputs(opened):
+    """Close a list of (filename, file) inputs, other than stdin."""
+    for filename, f in opened:
+        if filename != '-':
+            f.close()
+    opened.clear()
+
+
+def check_file(filename, key=None, reverse=False, unique=False,
+               quiet=False):
+    """
+    Check that a file is already sorted, stopping at the first line out
+    of order, which is reported unless quiet.  With unique, a line equal
+    to an earlier one with the same key is out of order too.  Return 0
+    if the file is sorted and 1 if it is not.
+    """
+    try:
+        previous = None
+        seen = set()
+        for number, line in enumerate(input_lines([filename]), 1):
+            current = line if key is None else key(line)
+            if number > 1:
+                if reverse:
+                    disorder = previous < current
+                else:
+                    disorder = current < previous
+                if unique and not disorder and current == previous:
+                    disorder = key is None or line in seen
+                if disorder:
+                    if not quiet:
+                        print(f"sort: {filename}:{number}: disorder: "
+                              f"{line}", file=sys.stderr)
+                    return 1
+
+            if unique and key is not None:
+                # Only lines with the same key can be repeats
+                if number == 1 or current != previous:
+                    seen.clear()
+                seen.add(line)
+            previous = current
+
+    except InputError as e:
+        return input_error(e.filename, e.error)
+
+    return 0
+
+
+def select_lines(lines, count, key=None, reverse=False, bottom=False,
+                 unique=False):
+    """
+    Return the first count lines of the sorted order, or with bottom the
+    last count, holding no more than that many at once.  A heap keeps
+    the lines chosen so far with the one to give up next at its root,
+    ranked by key and then by input position, so ties break exactly as
+    in a stable sort.
+    """
+    if count <= 0:
+        return []
+
+    # The root holds the worst line kept: the last in sorted order for
+    # the top lines, the first for the bottom ones
+    flip = bottom == reverse
+    heap = []
+    # With unique, the lines in the heap, and those given up that share
+    # the root's key, since a repeat of either must be dropped too
+    held = set()
+    tied = set()
+    worst = None
+    for index, line in enumerate(lines):
+        rank = line if key is None else key(line)
+        if worst is not None:
+            # Most lines lose to the root on their key alone
+            if (worst < rank) if flip else (rank < worst):
+                continue
+        if unique and (line in held or line in tied):
+            continue
+        item = (Descending(rank) if flip else rank,
+                index if bottom else -index, line)
+        if len(heap) < count:
+            heapq.heappush(heap, item)
+            if unique:
+                held.add(line)
+            if len(heap) < count:
+                continue
+        else:
+            if heap[0] < item:
+                dropped = heapq.heapreplace(heap, item)
+            else:
+                dropped = item
+            if unique:
+                if dropped is not item:
+                    held.discard(dropped[2])
+                    held.add(line)
+                if dropped[0] == heap[0][0]:
+                    tied.add(dropped[2])
+                elif dropped is not item:
+                    # The root's key moved on past every line in tied
+                    tied.clear()
+
+        worst = heap[0][0].value if flip else heap[0][0]
+
+    heap.sort(reverse=not bottom)
+    return [line for _, _, line in heap]
 
-    # Print sorted lines
-    for line in lines:
-        print(line)
+
+def select_files(files, count, key=None, reverse=False, bottom=False,
+                 unique=False):
+    """Write the first or last count lines that sorting files would."""
+    try:
+        lines = select_lines(input_lines(files), count, key, reverse,
+                             bottom, unique)
+    except InputError as e:
+        return input_error(e.filename, e.error)
+    write_lines(lines)
+    return 0
+
+
+def shuffle_files(files, rng, buffer_size=None, tmpdir=None,
+                  batch_size=None):
+    """Read all files and write their lines in random order."""
+    with ExternalShuffler(rng, buffer_size, tmpdir,
+                          batch_size) as shuffler:
+        try:
+            for filename in files:
+                try:
+                    f = open_input(filename)
+                    size = min(READ_SIZE, shuffler.buffer_size)
+                    for text in read_blocks(f, size):
+                        shuffler.extend(text)
+                    if filename != '-':
+                        f.close()
+                except TempFileError:
+                    raise
+                except Exception as e:
+                    return input_error(filename, e)
+
+            write_lines(shuffler.shuffled_lines())
+
+        except TempFileError as e:
+            print(f"sort: cannot create temporary file in "
+                  f"'{e.filename}': {e.strerror}", file=sys.stderr)
+            return 2
+
+    return 0
+
+
+def sort_files(files, reverse=False, numeric=False, unique=False,
+               buffer_size=None, tmpdir=None, batch_size=None, jobs=1,
+               keys=None, separator=None, fold_case=False,
+               ignore_blanks=False, human_numeric=False, version_sort=False,
+               merge=False, check=None, top=None, bottom=None,
+               shuffle=None):
+    """
+    Read all files and sort their lines.  With merge, the files are
+    already sorted and only merged; with check, set to 'diagnose' or
+    'quiet', the one file is only checked for being sorted.  With top
+    or bottom, only that many lines from the start or end of the sorted
+    order are kept.  With shuffle, a random.Random, the lines are put in
+    random order instead of sorted.
+    """
+    if shuffle is not None:
+        return shuffle_files(files, shuffle, buffer_size, tmpdir,
+                             batch_size)
+
+    if keys or fold_case or ignore_blanks or human_numeric or version_sort:
+        # Keys given no flags of their own take the global ones; without
+        # -k the whole line is the key
+        global_flags = {flag for flag, given in (
+            ('f', fold_case), ('n', numeric), ('h', human_numeric),
+            ('V', version_sort), ('r', reverse)) if given}
+        keydefs = keys or [KeyDef()]
+        for keydef in keydefs:
+            if not keydef.has_options():
+                keydef.flags = set(global_flags)
+                keydef.start_blanks = keydef.end_blanks = ignore_blanks
+        key, reverse = make_key(keydefs, separator)
+    else:
+        key = numeric_key if numeric else None
+
+    if check:
+        return check_file(files[0], key, reverse, unique, check == 'quiet')
+    if merge:
+        return merge_files(files, key, reverse, unique, tmpdir, batch_size)
+    if top is not None:
+        return select_files(files, top, key, reverse, False, unique)
+    if bottom is not None:
+        return select_files(files, bottom, key, reverse, True, unique)
+
+    if jobs <= 0:
+        jobs = os.cpu_count() or 1
+
+    with ExternalSorter(key, reverse, buffer_size, tmpdir, batch_size,
+                        jobs) as sorter:
+        for filename in files:
+            try:
+                f = open_input(filename)
+                size = min(READ_SIZE, sorter.buffer_size)
+                for text in read_blocks(f, size):
+                    sorter.extend(text)
+
+                if filename != '-':
+                    f.close()
+
+            except TempFileError as e:
+                print(f"sort: cannot create temporary file in "
+                      f"'{e.filename}': {e.strerror}", file=sys.stderr)
+                return 2
+            except Exception as e:
+                return input_error(filename, e)
+
+        try:
+            lines = sorter.sorted_lines()
+            if unique:
+                lines = unique_lines(lines, key)
+            write_lines(lines)
+        except TempFileError as e:
+            print(f"sort: cannot create temporary file in "
+                  f"'{e.filename}': {e.strerror}", file=sys.stderr)
+            return 2
 
     return 0
 
 
 def main():
     parser = argparse.ArgumentParser(
-        description='Sort lines of text FILE(s) and write to standard output.'
+        description='Sort lines of text FILE(s) and write to standard output.',
+        add_help=False
     )
 
+    parser.add_argument('--help', action='help',
+                        help='show this help message and exit')
+
     parser.add_argument('files', nargs='*', metavar='FILE',
                         help='files to sort (default: stdin)')
     parser.add_argument('-r', '--reverse', action='store_true',
@@ -79,13 +1351,120 @@ def main():
                         help='compare according to string numerical value')
     parser.add_argument('-u', '--unique', action='store_true',
                         help='output only unique lines')
+    parser.add_argument('-m', '--merge', action='store_true',
+                        help='merge already sorted files; do not sort')
+    parser.add_argument('-c', '--check', action='store_const',
+                        const='diagnose',
+                        help='check for sorted input; do not sort')
+    parser.add_argument('-C', action='store_const', const='quiet',
+                        dest='check',
+                        help='like -c, but do not report first bad line')
+    parser.add_argument('-b', '--ignore-leading-blanks', action='store_true',
+                        help='ignore leading blanks')
+    parser.add_argument('-f', '--ignore-case', action='store_true',
+                        help='fold lower case to upper case characters')
+    parser.add_argument('-h', '--human-numeric-sort', action='store_true',
+                        help='compare human readable numbers (e.g., 2K 1G)')
+    parser.add_argument('-V', '--version-sort', action='store_true',
+                        help='natural sort of (version) numbers within text')
+    parser.add_argument('-k', '--key', action='append', type=parse_key,
+                        metavar='KEYDEF',
+                        help='sort via a key; KEYDEF gives location and '
+                             'type: F[.C][OPTS][,F[.C][OPTS]], where OPTS '
+                             'are any of b, f, h, n, r, V')
+    parser.add_argument('-t', '--field-separator', metavar='SEP',
+                        help='use SEP instead of non-blank to blank '
+                             'transition')
+    parser.add_argument('-R', '--shuffle', action='store_true',
+                        help='write lines in random order; do not sort')
+    parser.add_argument('--random-source', metavar='FILE',
+                        help='seed the shuffle with bytes from FILE')
+    parser.add_argument('--seed', metavar='SEED',
+                        help='seed the shuffle with SEED, for a '
+                             'repeatable order')
+    parser.add_argument('--top', type=int, metavar='N',
+                        help='output only the first N lines of the sorted '
+                             'order, keeping N lines in memory')
+    parser.add_argument('--bottom', type=int, metavar='N',
+                        help='output only the last N lines of the sorted '
+                             'order, keeping N lines in memory')
+    parser.add_argument('-S', '--buffer-size', type=parse_size,
+                        metavar='SIZE',
+                        help='use SIZE of memory before spilling sorted '
+                             'runs to disk (suffixes b, K, M, G, T, %%)')
+    parser.add_argument('-T', '--temporary-directory', metavar='DIR',
+                        help='write run files in DIR instead of $TMPDIR '
+                             'or /tmp')
+    parser.add_argument('--batch-size', type=int, metavar='NMERGE',
+                        help='merge at most NMERGE runs at once')
+    parser.add_argument('--parallel', type=int, default=1, metavar='N',
+                        help='sort with N worker processes (0 = one per CPU)')
 
     args = parser.parse_args()
 
+    separator = args.field_separator
+    if separator is not None:
+        if separator == '\\0':
+            separator = '\0'
+        if not separator:
+            parser.error('empty tab')
+        if len(separator) > 1:
+            parser.error(f"multi-character tab '{separator}'")
+
+    orderings = [flag for flag, given in (
+        ('h', args.human_numeric_sort), ('n', args.numeric_sort),
+        ('V', args.version_sort)) if given]
+    if len(orderings) > 1:
+        parser.error(f"options '-{''.join(orderings)}' are incompatible")
+
+    check_flag = 'c' if args.check == 'diagnose' else 'C'
+    if args.check and args.merge:
+        parser.error(f"options '-{check_flag}m' are incompatible")
+
+    modes = [option for option, given in (
+        (f'-{check_flag}', args.check), ('-m', args.merge),
+        ('--top', args.top is not None),
+        ('--bottom', args.bottom is not None), ('-R', args.shuffle),
+        ('-u', args.shuffle and args.unique)) if given]
+    if len(modes) > 1 and ('--top' in modes or '--bottom' in modes or
+                           '-R' in modes):
+        parser.error(f"options '{modes[0]}' and '{modes[1]}' are "
+                     "incompatible")
+    for option, count in (('--top', args.top), ('--bottom', args.bottom)):
+        if count is not None and count < 0:
+            parser.error(f"invalid number for {option}: '{count}'")
+
+    if args.seed is not None and args.random_source is not None:
+        parser.error("options '--seed' and '--random-source' are "
+                     "incompatible")
+
+    shuffle = None
+    if args.shuffle:
+        seed = args.seed
+        if args.random_source is not None:
+            try:
+                with open(args.random_source, 'rb') as f:
+                    seed = f.read(RANDOM_SOURCE_BYTES)
+            except OSError as e:
+                print(f"sort: {args.random_source}: {e.strerror}",
+                      file=sys.stderr)
+                return 2
+        # Without a seed, the order comes from system entropy
+        shuffle = random.Random(seed)
+
     # If no files specified, read from stdin
     files = args.files if args.files else ['-']
+    if args.check and len(files) > 1:
+        parser.error(f"extra operand '{files[1]}' not allowed with "
+                     f"-{check_flag}")
 
-    return sort_files(files, args.reverse, args.numeric_sort, args.unique)
+    return sort_files(files, args.reverse, args.numeric_sort, args.unique,
+                      args.buffer_size, args.temporary_directory,
+                      args.batch_size, args.parallel, args.key, separator,
+                      args.ignore_case, args.ignore_leading_blanks,
+                      args.human_numeric_sort, args.version_sort,
+                      args.merge, args.check, args.top, args.bottom,
+                      shuffle)
 
 
 if __name__ == '__main__':
@@ -5,14 +5,533 @@ Classic Unix uniq implementation in Python
 """
 
 import sys
+import os
+import json
+import math
+import heapq
+import base64
+import shutil
+import time
 import argparse
+import itertools
+import tempfile
+from hashlib import blake2b
+from collections import Counter, OrderedDict
+
+
+# Memory the --unsorted count table may use before it is spilled to
+# partition files on disk, unless -S says otherwise
+DEFAULT_BUFFER_SIZE = 256 * 1024 * 1024
+
+# Estimated bytes held per distinct line in the count table, beyond its
+# characters: the str object, its dict slot and its count
+ENTRY_OVERHEAD = 100
+
+# Partition files a spilled count table is split across, by line hash
+SPILL_PARTITIONS = 64
+
+# Characters of input read at a time in --unsorted mode
+READ_SIZE = 64 * 1024
+
+# Buffer size for each partition and run file
+SPILL_BUFFER = 256 * 1024
+
+# HyperLogLog precision for --approx-distinct: 2**14 registers, for a
+# standard error of about 0.81%
+DEFAULT_PRECISION = 14
+PRECISIONS = range(4, 19)
+
+# Space-Saving counters kept for each line asked for by --top-k --approx
+COUNTERS_PER_LINE = 10
+
+SIZE_SUFFIXES = {'b': 1, 'k': 1 << 10, 'm': 1 << 20, 'g': 1 << 30,
+                 't': 1 << 40, 'p': 1 << 50, 'e': 1 << 60}
+
+
+def parse_size(text):
+    """
+    Parse a -S buffer size: a number with an optional suffix of b, K, M,
+    G, T, P or E (powers of 1024, K when none is given).
+    """
+    value = text.strip()
+    suffix = value[-1:].lower()
+    try:
+        if suffix in SIZE_SUFFIXES:
+            size = int(float(value[:-1]) * SIZE_SUFFIXES[suffix])
+        else:
+            size = int(float(value) * SIZE_SUFFIXES['k'])
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid buffer size: '{text}'")
+
+    if size < 1:
+        raise argparse.ArgumentTypeError(f"invalid buffer size: '{text}'")
+    return size
+
+
+def read_blocks(f, size=READ_SIZE):
+    """
+    Yield the lines of a text stream, without their newlines, as lists
+    read a block at a time.
+    """
+    partial = ''
+    while True:
+        text = f.read(size)
+        if not text:
+            break
+        lines = (partial + text).split('\n')
+        partial = lines.pop()
+        yield lines
+
+    if partial:
+        yield [partial]
+
+
+def open_spill(path, mode):
+    """Open a partition or run file."""
+    return open(path, mode, encoding='utf-8', errors='surrogatepass',
+                newline='\n', buffering=SPILL_BUFFER)
+
+
+def read_rows(path):
+    """Yield the (first, count, line) rows of a partition or run file."""
+    with open_spill(path, 'r') as f:
+        for row in f:
+            first, count, line = row[:-1].split('\t', 2)
+            yield int(first), int(count), line
+
+
+class GroupTable:
+    """
+    Count the distinct lines of unsorted input in one pass, in a dict
+    that keeps them in the order they were first seen.  When the table
+    outgrows buffer_size bytes, it is spilled to partition files in a
+    temporary directory under tmpdir, split by the hash of each line,
+    along with the position where each line was first seen.  At the end
+    every partition is totalled on its own and written out as a run in
+    output order, and the runs are merged.
+    """
+
+    def __init__(self, buffer_size=None, tmpdir=None):
+        self.buffer_size = buffer_size or DEFAULT_BUFFER_SIZE
+        self.tmpdir = tmpdir
+        self.table = Counter()
+        self.size = 0
+        self.seen = 0
+        self.spill_dir = None
+        self.partitions = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Remove any partition and run files."""
+        if self.partitions is not None:
+            for _, f in self.partitions:
+                f.close()
+            self.partitions = None
+        if self.spill_dir is not None:
+            shutil.rmtree(self.spill_dir, ignore_errors=True)
+            self.spill_dir = None
+
+    def update(self, lines):
+        """Count a list of lines, spilling the table when it is full."""
+        if not lines:
+            return
+        table = self.table
+        distinct = len(table)
+        table.update(lines)
+        # New lines are taken to be as long as the average in the block
+        width = sum(map(len, lines)) // len(lines)
+        self.size += (len(table) - distinct) * (ENTRY_OVERHEAD + width)
+        if self.size >= self.buffer_size:
+            self.spill()
+
+    def new_file(self, prefix):
+        """Create a file in the spill directory, returning its path."""
+        if self.spill_dir is None:
+            self.spill_dir = tempfile.mkdtemp(prefix='uniq',
+                                              dir=self.tmpdir)
+        fd, path = tempfile.mkstemp(prefix=prefix, dir=self.spill_dir)
+        os.close(fd)
+        return path
+
+    def spill(self):
+        """Append the table to the partition files and empty it."""
+        if self.partitions is None:
+            self.partitions = []
+            for _ in range(SPILL_PARTITIONS):
+                path = self.new_file('part')
+                self.partitions.append((path, open_spill(path, 'w')))
+
+        parts = [[] for _ in self.partitions]
+        for first, (line, count) in enumerate(self.table.items(),
+                                              self.seen):
+            parts[hash(line) % SPILL_PARTITIONS].append(
+                f"{first}\t{count}\t{line}\n")
+        for (_, f), part in zip(self.partitions, parts):
+            f.write(''.join(part))
+
+        self.seen += len(self.table)
+        self.table = Counter()
+        self.size = 0
+
+    def groups(self, by_count=False):
+        """
+        Return an iterator of (line, count) for every distinct line, in
+        the order they were first seen, or most frequent first with ties
+        in that order.
+        """
+        if self.partitions is None:
+            groups = self.table.items()
+            if by_count:
+                groups = sorted(groups, key=lambda group: group[1],
+                                reverse=True)
+            return iter(groups)
+
+        self.spill()
+        runs = []
+        for path, f in self.partitions:
+            f.close()
+            # Rows come in the order they were spilled, so the first row
+            # for a line has the earliest position
+            totals = {}
+            for first, count, line in read_rows(path):
+                if line in totals:
+                    totals[line][1] += count
+                else:
+                    totals[line] = [first, count]
+            os.unlink(path)
+
+            rows = [(first, count, line)
+                    for line, (first, count) in totals.items()]
+            del totals
+            if by_count:
+                rows.sort(key=lambda row: (-row[1], row[0]))
+
+            run = self.new_file('run')
+            with open_spill(run, 'w') as f:
+                f.writelines(f"{first}\t{count}\t{line}\n"
+                             for first, count, line in rows)
+            runs.append(run)
+        self.partitions = None
+
+        if by_count:
+            key = lambda row: (-row[1], row[0])
+        else:
+            key = lambda row: row[0]
+        rows = heapq.merge(*map(read_rows, runs), key=key)
+        return ((line, count) for _, count, line in rows)
+
+
+def line_hash(line):
+    """A 64-bit hash of a line that is the same in every process."""
+    digest = blake2b(line.encode('utf-8', 'surrogatepass'),
+                     digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+
+class HyperLogLog:
+    """
+    Estimate the number of distinct lines with HyperLogLog, in 2**precision
+    one-byte registers.  The relative standard error of the estimate is
+    about 1.04 / sqrt(2**precision): 1.6% at precision 12, 0.81% at 14
+    and 0.41% at 16.  Sketches of the same precision merge into the
+    sketch of all their inputs together.
+    """
+
+    kind = 'hyperloglog'
+
+    def __init__(self, precision=DEFAULT_PRECISION):
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def update(self, lines):
+        """Add a list of lines to the sketch."""
+        registers = self.registers
+        shift = 64 - self.precision
+        mask = (1 << shift) - 1
+        # A line seen twice changes nothing, so each is hashed once a block
+        for line in set(lines):
+            value = line_hash(line)
+            index = value >> shift
+            rank = shift - (value & mask).bit_length() + 1
+            if rank > registers[index]:
+                registers[index] = rank
+
+    def merge(self, other):
+        """Fold another sketch of the same precision into this one."""
+        if other.precision != self.precision:
+            raise ValueError(f"cannot merge a sketch of precision "
+                             f"{other.precision} into {self.precision}")
+        self.registers = bytearray(map(max, self.registers,
+                                       other.registers))
+
+    def estimate(self):
+        """Return the estimated number of distinct lines."""
+        size = len(self.registers)
+        if size == 16:
+            alpha = 0.673
+        elif size == 32:
+            alpha = 0.697
+        elif size == 64:
+            alpha = 0.709
+        else:
+            alpha = 0.7213 / (1 + 1.079 / size)
+        total = sum(count * math.ldexp(1.0, -rank)
+                    for rank, count in Counter(self.registers).items())
+        estimate = alpha * size * size / total
+
+        # Linear counting is more accurate while registers are still empty
+        empty = self.registers.count(0)
+        if estimate <= 2.5 * size and empty:
+            estimate = size * math.log(size / empty)
+        return round(estimate)
+
+    def to_dict(self):
+        """Return the sketch as data for JSON."""
+        return {'sketch': self.kind, 'precision': self.precision,
+                'registers': base64.b64encode(self.registers).decode()}
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuild a sketch from to_dict data."""
+        sketch = cls(data['precision'])
+        registers = base64.b64decode(data['registers'])
+        if len(registers) != len(sketch.registers):
+            raise ValueError('corrupt sketch registers')
+        sketch.registers = bytearray(registers)
+        return sketch
+
+
+class SpaceSaving:
+    """
+    Find the most frequent lines with the Space-Saving algorithm, in a
+    fixed number of counters.  A line without a counter, once all are in
+    use, takes over the smallest one and inherits its count.  So every
+    count is at least the line's true count and at most total / capacity
+    over it, and every line seen more than total / capacity times holds
+    a counter.  Sketches merge into one whose counts keep that bound
+    for the combined total.
+    """
+
+    kind = 'space-saving'
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.total = 0
+        self.counts = {}
+        self.errors = {}
+        # (count, line) for finding the smallest counter; entries whose
+        # count is out of date are skipped
+        self.heap = []
+
+    def update(self, lines):
+        """Add a list of lines to the sketch."""
+        self.total += len(lines)
+        for line, count in Counter(lines).items():
+            self.add(line, count)
+
+    def add(self, line, count, error=0):
+        """Count a line count times, with error possible overcount."""
+        counts = self.counts
+        errors = self.errors
+        if line in counts:
+            counts[line] += count
+            errors[line] += error
+        else:
+            if len(counts) >= self.capacity:
+                smallest, victim = self.pop_smallest()
+                del counts[victim]
+                del errors[victim]
+                count += smallest
+                error += smallest
+            counts[line] = count
+            errors[line] = error
+
+        heapq.heappush(self.heap, (counts[line], line))
+        if len(self.heap) > 4 * self.capacity:
+            self.heap = [(count, line) for line, count in counts.items()]
+            heapq.heapify(self.heap)
+
+    def pop_smallest(self):
+        """Remove the smallest current heap entry and return it."""
+        while True:
+            count, line = heapq.heappop(self.heap)
+            if self.counts.get(line) == count:
+                return count, line
+
+    def smallest(self):
+        """The count a line without a counter may have had."""
+        if len(self.counts) < self.capacity:
+            return 0
+        return min(self.counts.values())
+
+    def merge(self, other):
+        """Fold another sketch into this one."""
+        mine = self.smallest()
+        theirs = other.smallest()
+        merged = []
+        for line in self.counts.keys() | other.counts.keys():
+            count = self.counts.get(line, mine) + \
+                other.counts.get(line, theirs)
+            error = self.errors.get(line, mine) + \
+                other.errors.get(line, theirs)
+            merged.append((count, error, line))
+
+        self.counts = {}
+        self.errors = {}
+        self.heap = []
+        for count, error, line in heapq.nlargest(self.capacity, merged):
+            self.add(line, count, error)
+        self.total += other.total
+
+    def top(self, count):
+        """Return the count most frequent (line, count) pairs."""
+        return heapq.nsmallest(count, self.counts.items(),
+                               key=lambda item: (-item[1], item[0]))
+
+    def to_dict(self):
+        """Return the sketch as data for JSON."""
+        return {'sketch': self.kind, 'capacity': self.capacity,
+                'total': self.total,
+                'counters': [[line, count, self.errors[line]]
+                             for line, count in self.counts.items()]}
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuild a sketch from to_dict data."""
+        sketch = cls(data['capacity'])
+        for line, count, error in data['counters']:
+            sketch.add(line, count, error)
+        sketch.total = data['total']
+        return sketch
+
+
+def load_sketch(path):
+    """Read a sketch saved with --save-sketch."""
+    with open(path, 'r') as f:
+        data = json.load(f)
+    for cls in (HyperLogLog, SpaceSaving):
+        if isinstance(data, dict) and data.get('sketch') == cls.kind:
+            try:
+                return cls.from_dict(data)
+            except (KeyError, TypeError) as e:
+                raise ValueError(f"corrupt sketch: {e}") from e
+    raise ValueError('not a uniq sketch')
+
+
+def save_sketch(sketch, path):
+    """Write a sketch where --merge-sketch can read it back."""
+    with open(path, 'w') as f:
+        json.dump(sketch.to_dict(), f)
+        f.write('\n')
+
+
+def available_blocks(f, size=READ_SIZE):
+    """
+    Yield the lines of a text stream, without their newlines, as lists
+    of the whole lines each read returns.  From a pipe a read takes only
+    what is there, so lines come through as they are written.
+    """
+    partial = b''
+    while True:
+        data = f.buffer.read1(size)
+        if not data:
+            break
+        data = partial + data
+        end = data.rfind(b'\n') + 1
+        partial = data[end:]
+        if end:
+            text = data[:end].decode(f.encoding, f.errors)
+            if '\r' in text:
+                text = text.replace('\r\n', '\n')
+            lines = text.split('\n')
+            lines.pop()
+            yield lines
+
+    if partial:
+        yield [partial.decode(f.encoding, f.errors)]
+
+
+def window_lines(f_in, f_out, lines=None, seconds=None, summary=False,
+                 clock=time.monotonic):
+    """
+    Write each line not seen within the last given number of input
+    lines, or seconds, dropping the rest.  Lines seen within the window
+    are kept in an OrderedDict by when each was last seen, so the ones
+    that fall out of it are evicted from the front and memory is bounded
+    by the window.  With summary, a line that leaves the window after
+    repeats were dropped is followed by a note of how many, and at the
+    end of input every line still in the window is.  Output is flushed
+    after each read of input, so a pipeline tailing a log sees lines as
+    they come.
+    """
+    window = seconds if seconds is not None else lines
+    # Each line in the window: when it was last seen and repeats dropped
+    recent = OrderedDict()
+    number = 0
+    for block in available_blocks(f_in):
+        output = []
+        if seconds is not None:
+            now = clock()
+        for line in block:
+            if seconds is None:
+                now = number
+                number += 1
+
+            while recent:
+                oldest = next(iter(recent))
+                seen, suppressed = recent[oldest]
+                if seen >= now - window:
+                    break
+                del recent[oldest]
+                if summary and suppressed:
+                    output.append(f"[{suppressed} suppressed] {oldest}\n")
+
+            entry = recent.get(line)
+            if entry is None:
+                recent[line] = [now, 0]
+                output.append(f"{line}\n")
+            else:
+                entry[0] = now
+                entry[1] += 1
+                recent.move_to_end(line)
+
+        f_out.write(''.join(output))
+        f_out.flush()
+
+    if summary:
+        for line, (_, suppressed) in recent.items():
+            if suppressed:
+                f_out.write(f"[{suppressed} suppressed] {line}\n")
 
 
 def uniq_lines(input_file, output_file, count=False, duplicates_only=False,
-               unique_only=False):
-    """Process lines and output unique or duplicate lines."""
+               unique_only=False, unsorted=False, by_count=False,
+               buffer_size=None, tmpdir=None, top_k=None, sketch=None,
+               sketch_path=None, window=None, window_seconds=None,
+               summary=False):
+    """
+    Process lines and output unique or duplicate lines.  With unsorted,
+    equal lines are grouped wherever they are in the input, and the
+    groups output in the order they were first seen, or by_count, most
+    frequent first; top_k keeps only that many of the most frequent.
+
+    With a sketch, a HyperLogLog or SpaceSaving, the input is added to
+    it instead, and the estimated distinct count or top_k lines output.
+    The sketch is saved to sketch_path if given.  An input_file of None
+    reads nothing, for reporting on sketches merged from elsewhere.
+
+    With window or window_seconds, a line is output only if it was not
+    seen within that many lines or seconds before, as window_lines.
+    """
     try:
-        if input_file == '-':
+        if input_file is None:
+            f_in = None
+        elif input_file == '-':
             f_in = sys.stdin
         else:
             f_in = open(input_file, 'r')
@@ -37,24 +556,45 @@ def uniq_lines(input_file, output_file, count=False, duplicates_only=False,
             else:
                 f_out.write(f"{line}\n")
 
-        for line in f_in:
-            line = line.rstrip('\n')
-
-            if line == prev_line:
-                line_count += 1
+        if window is not None or window_seconds is not None:
+            window_lines(f_in, f_out, window, window_seconds, summary)
+        elif sketch is not None:
+            if f_in is not None:
+                for lines in read_blocks(f_in):
+                    sketch.update(lines)
+            if sketch_path is not None:
+                save_sketch(sketch, sketch_path)
+            if top_k is None:
+                f_out.write(f"{sketch.estimate()}\n")
             else:
-                # Output previous line if exists
-                if prev_line is not None:
-                    output_line(prev_line, line_count)
+                for line, line_count in sketch.top(top_k):
+                    output_line(line, line_count)
+        elif unsorted or top_k is not None:
+            with GroupTable(buffer_size, tmpdir) as table:
+                for lines in read_blocks(f_in):
+                    table.update(lines)
+                groups = table.groups(by_count or top_k is not None)
+                for line, line_count in itertools.islice(groups, top_k):
+                    output_line(line, line_count)
+        else:
+            for line in f_in:
+                line = line.rstrip('\n')
+
+                if line == prev_line:
+                    line_count += 1
+                else:
+                    # Output previous line if exists
+                    if prev_line is not None:
+                        output_line(prev_line, line_count)
 
-                prev_line = line
-                line_count = 1
+                    prev_line = line
+                    line_count = 1
 
-        # Output last line
-        if prev_line is not None:
-            output_line(prev_line, line_count)
+            # Output last line
+            if prev_line is not None:
+                output_line(prev_line, line_count)
 
-        if input_file != '-':
+        if input_file not in (None, '-'):
             f_in.close()
         if output_file != '-':
             f_out.close()
@@ -77,7 +617,7 @@ def main():
         description='Filter adjacent matching lines from INPUT, writing to OUTPUT.'
     )
 
-    parser.add_argument('input', nargs='?', default='-', metavar='INPUT',
+    parser.add_argument('input', nargs='?', metavar='INPUT',
                         help='input file (default: stdin)')
     parser.add_argument('output', nargs='?', default='-', metavar='OUTPUT',
                         help='output file (default: stdout)')
@@ -87,11 +627,122 @@ def main():
                         help='only print duplicate lines, one for each group')
     parser.add_argument('-u', '--unique', action='store_true',
                         help='only print unique lines')
+    parser.add_argument('-g', '--unsorted', action='store_true',
+                        help='group equal lines anywhere in the input, '
+                             'not only adjacent ones')
+    parser.add_argument('--order', choices=('first', 'count'),
+                        default='first',
+                        help='with -g, output groups in the order first '
+                             'seen (default) or most frequent first')
+    parser.add_argument('-S', '--buffer-size', type=parse_size,
+                        metavar='SIZE',
+                        help='with -g, use SIZE of memory before spilling '
+                             'counts to disk (suffixes b, K, M, G, T)')
+    parser.add_argument('-T', '--temporary-directory', metavar='DIR',
+                        help='with -g, write spill files in DIR instead '
+                             'of $TMPDIR or /tmp')
+
+    parser.add_argument('--window', type=int, metavar='N',
+                        help='output a line only if it was not seen in '
+                             'the N lines before')
+    parser.add_argument('--window-seconds', type=float, metavar='S',
+                        help='output a line only if it was not seen in '
+                             'the S seconds before')
+    parser.add_argument('--summary', action='store_true',
+                        help='with a window, note how many repeats of a '
+                             'line were dropped when it leaves the window')
+    parser.add_argument('--top-k', type=int, metavar='K',
+                        help='output only the K most frequent lines, '
+                             'grouped as with -g')
+    parser.add_argument('--approx', action='store_true',
+                        help='with --top-k, estimate with Space-Saving '
+                             'counters in fixed memory; each count is '
+                             'over by at most lines/M')
+    parser.add_argument('--counters', type=int, metavar='M',
+                        help='with --approx, keep M counters '
+                             f'(default: {COUNTERS_PER_LINE} per line '
+                             'asked for)')
+    parser.add_argument('--approx-distinct', action='store_true',
+                        help='output the estimated number of distinct '
+                             'lines, from a HyperLogLog sketch')
+    parser.add_argument('--precision', type=int, default=DEFAULT_PRECISION,
+                        choices=PRECISIONS, metavar='P',
+                        help='with --approx-distinct, use 2**P registers '
+                             'for a standard error of 1.04/sqrt(2**P) '
+                             f'(4-18, default: {DEFAULT_PRECISION})')
+    parser.add_argument('--save-sketch', metavar='FILE',
+                        help='with --approx or --approx-distinct, save the '
+                             'sketch to FILE')
+    parser.add_argument('--merge-sketch', action='append', default=[],
+                        metavar='FILE',
+                        help='fold in a sketch saved by --save-sketch; '
+                             'stdin is not read unless INPUT is given')
 
     args = parser.parse_args()
 
-    return uniq_lines(args.input, args.output, args.count,
-                     args.repeated, args.unique)
+    if args.top_k is not None and args.top_k < 0:
+        parser.error(f"invalid number for --top-k: '{args.top_k}'")
+    if args.approx and args.top_k is None:
+        parser.error('--approx requires --top-k')
+    if args.approx and args.approx_distinct:
+        parser.error('--top-k and --approx-distinct are incompatible')
+    if args.counters is not None and not args.approx:
+        parser.error('--counters requires --approx')
+    if args.counters is not None and args.counters < 1:
+        parser.error(f"invalid number for --counters: '{args.counters}'")
+    if (args.save_sketch or args.merge_sketch) and \
+            not (args.approx or args.approx_distinct):
+        parser.error('sketches need --approx or --approx-distinct')
+
+    windowed = args.window is not None or args.window_seconds is not None
+    if args.window is not None and args.window < 1:
+        parser.error(f"invalid number for --window: '{args.window}'")
+    if args.window_seconds is not None and not args.window_seconds > 0:
+        parser.error(f"invalid number for --window-seconds: "
+                     f"'{args.window_seconds}'")
+    if args.summary and not windowed:
+        parser.error('--summary requires --window or --window-seconds')
+    others = [option for option, given in (
+        ('--window', args.window is not None),
+        ('--window-seconds', args.window_seconds is not None),
+        ('-c', args.count), ('-d', args.repeated), ('-u', args.unique),
+        ('-g', args.unsorted), ('--top-k', args.top_k is not None),
+        ('--approx-distinct', args.approx_distinct)) if given]
+    if windowed and len(others) > 1:
+        parser.error(f"options '{others[0]}' and '{others[1]}' are "
+                     "incompatible")
+
+    sketch = None
+    if args.approx_distinct:
+        sketch = HyperLogLog(args.precision)
+    elif args.approx:
+        sketch = SpaceSaving(args.counters or
+                             max(args.top_k, 1) * COUNTERS_PER_LINE)
+
+    for path in args.merge_sketch:
+        try:
+            other = load_sketch(path)
+            if other.kind != sketch.kind:
+                raise ValueError(f"not a {sketch.kind} sketch")
+            sketch.merge(other)
+        except OSError as e:
+            print(f"uniq: {path}: {e.strerror}", file=sys.stderr)
+            return 1
+        except ValueError as e:
+            print(f"uniq: {path}: {e}", file=sys.stderr)
+            return 1
+
+    # Reports on merged sketches need no input of their own
+    input_file = args.input
+    if input_file is None and not args.merge_sketch:
+        input_file = '-'
+
+    return uniq_lines(input_file, args.output, args.count,
+                     args.repeated, args.unique, args.unsorted,
+                     args.order == 'count', args.buffer_size,
+                     args.temporary_directory, args.top_k, sketch,
+                     args.save_sketch, args.window, args.window_seconds,
+                     args.summary)
 
 
 if __name__ == '__main__':
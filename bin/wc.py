@@ -5,7 +5,102 @@ Classic Unix wc implementation in Python
 """
 
 import sys
+import os
+import stat
+import codecs
 import argparse
+import collections
+
+
+# Bytes read per step; memory use does not depend on the file size
+BLOCK_SIZE = 1024 * 1024
+
+# With -j, files of at least two chunks are split across workers
+CHUNK_SIZE = 16 * 1024 * 1024
+
+# ASCII characters that str.split() treats as whitespace
+ASCII_SPACE = b' \t\n\r\x0b\x0c\x1c\x1d\x1e\x1f'
+
+# Maps the separators bytes.split() does not know about to spaces
+TO_SPACE = bytes.maketrans(b'\x1c\x1d\x1e\x1f', b'    ')
+
+
+def count_stream(f, count_words=True, count_chars=True, size=None):
+    """
+    Count lines, words, characters and bytes in a binary stream, one
+    block at a time, stopping after size bytes if given.  Whether the
+    last block ended inside a word is carried over so words split across
+    blocks are counted once.  Pure ASCII blocks are counted as bytes;
+    other blocks go through an incremental UTF-8 decoder so the counts
+    match decoding the whole file.
+    Returns tuple: (lines, words, chars, bytes, starts_in_word,
+    ends_in_word), where the last two tell whether the first and last
+    characters belong to a word.
+    """
+    lines = words = chars = byte_count = 0
+    in_word = False
+    starts_in_word = None
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    need_text = count_words or count_chars
+
+    while True:
+        if size is None:
+            block = f.read(BLOCK_SIZE)
+        else:
+            block = f.read(min(BLOCK_SIZE, size - byte_count))
+        if not block:
+            break
+
+        byte_count += len(block)
+        lines += block.count(b'\n')
+
+        if not need_text:
+            continue
+
+        if block.isascii() and not decoder.getstate()[0]:
+            chars += len(block)
+            if count_words:
+                words += len(block.translate(TO_SPACE).split())
+                if starts_in_word is None:
+                    starts_in_word = block[0] not in ASCII_SPACE
+                elif in_word and block[0] not in ASCII_SPACE:
+                    words -= 1
+                in_word = block[-1] not in ASCII_SPACE
+            continue
+
+        text = decoder.decode(block)
+        if not text:
+            continue
+        chars += len(text)
+        if count_words:
+            words += len(text.split())
+            if starts_in_word is None:
+                starts_in_word = not text[0].isspace()
+            elif in_word and not text[0].isspace():
+                words -= 1
+            in_word = not text[-1].isspace()
+
+    # Flush an incomplete sequence at the end of the file
+    text = decoder.decode(b'', final=True)
+    chars += len(text)
+    if count_words and text:
+        words += len(text.split())
+        if starts_in_word is None:
+            starts_in_word = not text[0].isspace()
+        elif in_word and not text[0].isspace():
+            words -= 1
+        in_word = not text[-1].isspace()
+
+    return (lines, words, chars, byte_count, bool(starts_in_word), in_word)
+
+
+def error_message(filename, error):
+    """Format the error message for a file that could not be counted."""
+    if isinstance(error, FileNotFoundError):
+        return f"wc: {filename}: No such file or directory"
+    if isinstance(error, PermissionError):
+        return f"wc: {filename}: Permission denied"
+    return f"wc: {filename}: {error}"
 
 
 def count_file(filename, show_lines=True, show_words=True,
@@ -16,32 +111,143 @@ def count_file(filename, show_lines=True, show_words=True,
     """
     try:
         if filename == '-':
-            f = sys.stdin
-            content = f.read()
-        else:
-            with open(filename, 'rb') as f:
-                content_bytes = f.read()
-                byte_count = len(content_bytes)
-                content = content_bytes.decode('utf-8', errors='replace')
+            return count_stream(sys.stdin.buffer, show_words, show_chars)[:4]
 
-        lines = content.count('\n')
-        words = len(content.split())
-        chars = len(content)
+        with open(filename, 'rb') as f:
+            return count_stream(f, show_words, show_chars)[:4]
 
-        if filename == '-':
-            byte_count = len(content.encode('utf-8'))
+    except Exception as e:
+        print(error_message(filename, e), file=sys.stderr)
+        return None
 
-        return (lines, words, chars, byte_count)
 
-    except FileNotFoundError:
-        print(f"wc: {filename}: No such file or directory", file=sys.stderr)
-        return None
-    except PermissionError:
-        print(f"wc: {filename}: Permission denied", file=sys.stderr)
-        return None
+def count_chunk(task):
+    """
+    Count one byte range of a file in a worker process; end is None to
+    count to the end of the file.
+    Returns (count_stream result, error_message).
+    """
+    filename, start, end, count_words, count_chars = task
+    try:
+        with open(filename, 'rb') as f:
+            f.seek(start)
+            size = None if end is None else end - start
+            return count_stream(f, count_words, count_chars, size), None
     except Exception as e:
-        print(f"wc: {filename}: {e}", file=sys.stderr)
-        return None
+        return None, error_message(filename, e)
+
+
+def split_file(filename):
+    """
+    Split a large regular file into (start, end) byte ranges for -j.
+    Each boundary is moved forward onto the start of a UTF-8 character,
+    so decoding the pieces separately gives the same characters as
+    decoding the whole file.  Small or special files are one range.
+    """
+    try:
+        info = os.stat(filename)
+    except OSError:
+        return [(0, None)]  # Let the worker report the error
+    if not stat.S_ISREG(info.st_mode) or info.st_size < 2 * CHUNK_SIZE:
+        return [(0, None)]
+
+    bounds = [0]
+    with open(filename, 'rb') as f:
+        for nominal in range(CHUNK_SIZE, info.st_size, CHUNK_SIZE):
+            f.seek(nominal)
+            data = f.read(3)
+            # Skip continuation bytes (at most three can follow a lead byte)
+            skip = 0
+            while skip < len(data) and 0x80 <= data[skip] < 0xc0:
+                skip += 1
+            if nominal + skip < info.st_size:
+                bounds.append(nominal + skip)
+    bounds.append(info.st_size)
+
+    return list(zip(bounds, bounds[1:]))
+
+
+def combine_chunks(parts):
+    """
+    Add up the count_stream results of consecutive ranges of one file.
+    A word that runs across a boundary was counted in both ranges, so
+    it is taken off once.
+    Returns tuple: (lines, words, chars, bytes)
+    """
+    lines = sum(part[0] for part in parts)
+    words = sum(part[1] for part in parts)
+    chars = sum(part[2] for part in parts)
+    byte_count = sum(part[3] for part in parts)
+
+    for before, after in zip(parts, parts[1:]):
+        if before[5] and after[4]:
+            words -= 1
+
+    return (lines, words, chars, byte_count)
+
+
+def count_parallel(files, jobs, show_words=True, show_chars=True):
+    """
+    Count files in a pool of worker processes, yielding (filename,
+    result) in file order; result is (lines, words, chars, bytes), or
+    None if the file could not be counted.  Large files are split into
+    ranges counted concurrently, and only about 2 * jobs ranges are in
+    flight at a time so file lists can be streamed in.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    def finish(filename, futures):
+        if futures is None:
+            # Standard input can only be read here
+            return filename, count_file('-', show_words=show_words,
+                                        show_chars=show_chars)
+        parts = []
+        for future in futures:
+            part, error = future.result()
+            if error:
+                print(error, file=sys.stderr)
+                return filename, None
+            parts.append(part)
+        return filename, combine_chunks(parts)
+
+    pending = collections.deque()
+    in_flight = 0
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        for filename in files:
+            if filename == '-':
+                pending.append((filename, None))
+            else:
+                futures = [executor.submit(count_chunk, (filename, start, end,
+                                                         show_words,
+                                                         show_chars))
+                           for start, end in split_file(filename)]
+                pending.append((filename, futures))
+                in_flight += len(futures)
+
+            while pending and (in_flight > 2 * jobs or
+                               pending[0][1] is None):
+                filename, futures = pending.popleft()
+                in_flight -= len(futures or ())
+                yield finish(filename, futures)
+
+        while pending:
+            yield finish(*pending.popleft())
+
+
+def read_names(f):
+    """Yield the NUL-terminated file names listed in a binary stream."""
+    pending = b''
+    while True:
+        block = f.read(BLOCK_SIZE)
+        if not block:
+            break
+        names = (pending + block).split(b'\0')
+        pending = names.pop()
+        for name in names:
+            yield os.fsdecode(name)
+    if pending:
+        yield os.fsdecode(pending)
 
 
 def format_output(lines, words, chars, bytes_count, filename,
@@ -79,6 +285,11 @@ def main():
                         help='print the byte counts')
     parser.add_argument('-m', '--chars', action='store_true',
                         help='print the character counts')
+    parser.add_argument('-j', '--jobs', type=int, default=1, metavar='N',
+                        help='count with N worker processes (0 = one per CPU)')
+    parser.add_argument('--files0-from', metavar='F',
+                        help='read NUL-terminated file names from F '
+                             '(- means standard input)')
 
     args = parser.parse_args()
 
@@ -94,19 +305,40 @@ def main():
         show_chars = args.chars
         show_bytes = args.bytes
 
-    # If no files specified, read from stdin
-    files = args.files if args.files else ['-']
+    if args.files0_from is not None:
+        if args.files:
+            parser.error('file operands cannot be combined with --files0-from')
+        try:
+            if args.files0_from == '-':
+                names = sys.stdin.buffer
+            else:
+                names = open(args.files0_from, 'rb')
+            files = read_names(names)
+        except Exception as e:
+            print(error_message(args.files0_from, e), file=sys.stderr)
+            return 1
+    else:
+        # If no files specified, read from stdin
+        files = args.files if args.files else ['-']
+
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    if jobs > 1:
+        results = count_parallel(files, jobs, show_words, show_chars)
+    else:
+        results = ((filename, count_file(filename, show_lines, show_words,
+                                         show_chars, show_bytes))
+                   for filename in files)
 
     # Process files
     total_lines = 0
     total_words = 0
     total_chars = 0
     total_bytes = 0
+    file_count = 0
     successful_files = 0
 
-    for filename in files:
-        result = count_file(filename, show_lines, show_words,
-                          show_chars, show_bytes)
+    for filename, result in results:
+        file_count += 1
 
         if result is None:
             continue
@@ -124,7 +356,7 @@ def main():
                           show_chars, show_bytes))
 
     # Print totals if multiple files
-    if len(files) > 1 and successful_files > 1:
+    if file_count > 1 and successful_files > 1:
         print(format_output(total_lines, total_words, total_chars,
                           total_bytes, "total", show_lines,
                           show_words, show_chars, show_bytes))
@@ -0,0 +1,54 @@
+"""
+Tests for grep's byte-level prefilters: patterns that escape non-ASCII
+characters must match the same lines as the plain str regex would.
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+GREP = os.path.join(os.path.dirname(__file__), '..', 'bin', 'grep.py')
+
+
+def grep(*args, data=b''):
+    """Run grep.py on a file holding data, returning (status, output)."""
+    with tempfile.NamedTemporaryFile(suffix='.txt', delete=False) as f:
+        f.write(data)
+    try:
+        result = subprocess.run([sys.executable, GREP, *args, f.name],
+                                capture_output=True)
+    finally:
+        os.unlink(f.name)
+    return result.returncode, result.stdout
+
+
+class NonAsciiEscapeTest(unittest.TestCase):
+
+    PATTERNS = [r'\xe9', r'\351', r'[\xe0-\xff]', r'é',
+                r'\U000000e9', r'\N{LATIN SMALL LETTER E WITH ACUTE}',
+                r'caf\xe9', r'ca.\xe9']
+
+    def test_count(self):
+        for pattern in self.PATTERNS:
+            with self.subTest(pattern=pattern):
+                self.assertEqual(
+                    grep('-c', pattern, data='café\nplain\n'.encode()),
+                    (0, b'1\n'))
+
+    def test_multiline(self):
+        for pattern in self.PATTERNS:
+            with self.subTest(pattern=pattern):
+                self.assertEqual(
+                    grep('--multiline', '-c', pattern,
+                         data='café\nplain\n'.encode()),
+                    (0, b'1\n'))
+
+    def test_no_match(self):
+        self.assertEqual(grep('-c', r'\xe8', data='café\n'.encode()),
+                         (1, b'0\n'))
+
+
+if __name__ == '__main__':
+    unittest.main()